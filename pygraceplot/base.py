@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=C0326,R0903,C0116,R0205
 """base classes for objects in grace plot"""
+import sys
 import time
-from copy import deepcopy
+import weakref
 from pygraceplot.map import ColorMap
 from pygraceplot.utils import get_int_const, encode_string
 
 plot_colormap = ColorMap()
 
 class _IntMap:
+    __slots__ = ()
     pair = {None: None}
 
     @classmethod
@@ -229,7 +231,11 @@ class _Affix:
         affix (str) : the content to add as the affix, 0,1,2 or x,y,altx,alty
         is_prefix (bool) : if True, the content will be added as prefix to object marker
             Otherwise as suffix
+
+    The slots of affix, i.e. _affix and _is_prefix, are added to
+    subclasses of _BaseOutput by its metaclass.
     """
+    __slots__ = ()
     _marker = ""
 
     def __init__(self, affix, is_prefix=False):
@@ -237,7 +243,126 @@ class _Affix:
         self._is_prefix = is_prefix
 
 
-class _BaseOutput(object):
+def _compile_attr_export(marker, attr, typ, form):
+    """compile the function to export the value of an attribute
+
+    The returned function accepts the value of attribute and returns
+    the exported string, which is to be appended to the prefix of object.
+    Strings that depend only on the class, e.g. the attribute name, are rendered here.
+    """
+    if typ in [list, tuple, set]:
+        form = " " + attr.replace("_", " ") + " " + form
+        return lambda v: form.format(*v)
+    if typ is not bool:
+        return (" " + attr.replace("_", " ") + " " + form).format
+
+    # special property marked by the type as bool.
+    # The marker name in the attribute is removed to avoid duplicate
+    def clean(s):
+        return s.replace(marker, "").replace("_", " ")
+
+    for suffix, get_str in [("_switch", Switch.get_str),
+                            ("_pointing", Pointing.get_str),
+                            ("_placement", Placement.get_str)]:
+        if attr.endswith(suffix):
+            lead = " " + clean(attr.replace(suffix, "")) + " "
+            return lambda v: lead + clean(get_str(v))
+    # for location-like attribute
+    if attr.endswith("_location"):
+        lead = " " + clean(attr.replace("_location", "")) + " "
+        return lambda v: lead + clean(form.format(*v))
+    # for arbitray string attribute
+    if attr.endswith("_comment"):
+        lead = " " + clean(attr.replace("_comment", "")) + " "
+        return lambda v: lead + clean(encode_string(form.format(v)))
+    # for Symbol type
+    return lambda v: " " + clean(form.format(v))
+
+
+def _compile_attr_init(attr, typ, default):
+    """compile the table entry to initialize an attribute
+
+    Returns:
+        tuple, attribute name, the converter of input value, the converted default
+        and whether the default should be copied for each instance
+    """
+    if typ is not bool:
+        conv = typ
+    elif attr.endswith("_location"):
+        conv = list
+    else:
+        conv = None
+    if conv is not None:
+        default = conv(default)
+    return attr, conv, default, conv in [list, set]
+
+
+class _OutputMeta(type):
+    """metaclass of _BaseOutput to check the attributes and compile
+    their initialization and export at class creation
+
+    The class gets __slots__ for the attributes in _attrs, in addition to
+    those in its own __slots__, which should list other instance attributes.
+    """
+    def __new__(mcs, name, bases, namespace):
+        attrs = namespace.get("_attrs", None)
+        for b in bases:
+            if attrs is not None:
+                break
+            attrs = getattr(b, "_attrs", None)
+        if not isinstance(attrs, dict):
+            raise TypeError("_attrs of {} should be dict, got {}".format(name, attrs))
+        inherited = set()
+        for b in bases:
+            for c in b.__mro__:
+                inherited.update(c.__dict__.get("__slots__", ()))
+        slots = list(namespace.get("__slots__", ()))
+        names = [attr for attr in attrs if attr is not None]
+        if any(issubclass(b, _Affix) for b in bases):
+            names += ["_affix", "_is_prefix"]
+        for attr in names:
+            if attr not in inherited and attr not in slots:
+                slots.append(attr)
+        namespace["__slots__"] = tuple(slots)
+        cls = type.__new__(mcs, name, bases, namespace)
+        if sys.version_info < (3, 6):
+            # type calls __set_name__ of descriptors only from Python 3.6
+            for key, value in namespace.items():
+                if hasattr(value, "__set_name__"):
+                    value.__set_name__(cls, key)
+        return cls
+
+    def __init__(cls, name, bases, namespace):
+        type.__init__(cls, name, bases, namespace)
+        if not isinstance(cls._marker, str):
+            raise TypeError("_marker of {} should be str, got {}".format(name, cls._marker))
+        for attr, x in cls._attrs.items():
+            if len(x) != 3:
+                raise ValueError("_attrs of {} should have 3 members for {}, got {}"
+                                 .format(name, attr, x))
+        cls._init_table = tuple(_compile_attr_init(attr, typ, default)
+                                for attr, (typ, default, _) in cls._attrs.items()
+                                if attr is not None)
+        cls._export_prefix = cls._marker.replace("_", " ")
+        cls._has_affix = issubclass(cls, _Affix)
+        attrs = [(attr, typ, f) for attr, (typ, _, f) in cls._attrs.items() if attr is not None]
+        cls._export_attrs = tuple(attr for attr, _, _ in attrs)
+        cls._exporters = tuple(_compile_attr_export(cls._marker, attr, typ, f)
+                               for attr, typ, f in attrs)
+        cls._grace_default_values = tuple(cls._grace_defaults.get(attr, _NO_DEFAULT)
+                                          for attr in cls._export_attrs)
+        cls._copy_slots = tuple(slot for c in cls.__mro__ for slot in c.__dict__.get("__slots__", ())
+                                if slot not in ["_parent", "_shared", "__weakref__"])
+
+
+# marker of attributes without a known default in Grace
+_NO_DEFAULT = object()
+
+# shared instances of _BaseOutput, see _BaseOutput.shared
+_shared_objects = weakref.WeakValueDictionary()
+
+
+class _BaseOutput(metaclass=_OutputMeta):
     """abstract class for initializing and printing element object
 
     _attrs and _marker must be redefined,
@@ -247,27 +372,92 @@ class _BaseOutput(object):
 
     When type is bool, it will be treated invidually as a special
     attribute.
+
+    The exported lines are cached until an attribute is set. Setting
+    an attribute also drops the cache of the parent objects, i.e. those
+    holding the object as an attribute, so that only the changed parts
+    are exported again. Mutating a list attribute in place does not
+    invalidate the cache, set it instead.
+
+    Instances created by `shared` are immutable and shared by all
+    the objects requesting the same arguments, together with their cached export.
+
+    For minimal export, _grace_defaults maps attributes to the values that Grace
+    assumes when they are absent, and such attributes are omitted.
+    Only defaults that do not depend on the `@default` lines are included.
+    _inert_switch is a tuple of attribute and value, with which the object is not drawn
+    at all, e.g. a switch being off. Only that attribute is exported in this case.
+    _caches are the slots reset to None when the object or any of its children changes.
     """
+    __slots__ = ("_export_cache", "_parent", "_shared", "__weakref__")
     _attrs = {None: [None, None, None]}
     _marker = ''
+    _grace_defaults = {}
+    _inert_switch = None
+    _caches = ("_export_cache",)
+
+    def __new__(cls, *args, **kwargs):
+        self = object.__new__(cls)
+        object.__setattr__(self, "_export_cache", None)
+        object.__setattr__(self, "_parent", None)
+        object.__setattr__(self, "_shared", False)
+        return self
+
+    @classmethod
+    def shared(cls, **kwargs):
+        """get the immutable instance shared by all requests with the same arguments
+
+        A private instance is returned if the arguments are not hashable.
+        Use copy to get a mutable instance from the shared one.
+
+        Args:
+            kwargs : arguments to initialize the instance
+        """
+        key = (cls,) + tuple(sorted((k, type(v), v) for k, v in kwargs.items()))
+        try:
+            obj = _shared_objects.get(key)
+        except TypeError:
+            return cls(**kwargs)
+        if obj is None:
+            obj = cls(**kwargs)
+            object.__setattr__(obj, "_shared", True)
+            _shared_objects[key] = obj
+        return obj
+
+    def copy(self):
+        """get a mutable copy of the object, which is not shared by others.
+
+        Sub-objects are not copied."""
+        new = self.__new__(self.__class__)
+        for slot in self._copy_slots:
+            try:
+                v = self.__getattribute__(slot)
+            except AttributeError:
+                continue
+            if isinstance(v, (list, dict)):
+                v = v.copy()
+            object.__setattr__(new, slot, v)
+        return new
+
+    def _own(self, name):
+        """get the sub-object `name`, which is replaced by a copy first if it is shared"""
+        obj = self.__getattribute__(name)
+        if obj._shared:
+            obj = obj.copy()
+            self.__setattr__(name, obj)
+        return obj
 
     def __init__(self, **kwargs):
-        assert isinstance(self._attrs, dict)
-        for x in self._attrs.values():
-            assert len(x) == 3
-        assert isinstance(self._marker, str)
-        for attr, (typ, default, _) in self._attrs.items():
+        for attr, conv, default, copy in self._init_table:
             v = kwargs.get(attr, None)
             if v is None:
-                v = default
-            try:
-                self.__getattribute__(attr)
-            except AttributeError:
-                if typ is not bool:
-                    v = typ(v)
-                elif attr.endswith('_location'):
-                    v = list(v)
-                self.__setattr__(attr, v)
+                if copy:
+                    v = conv(default)
+                else:
+                    v = default
+            elif conv is not None:
+                v = conv(v)
+            object.__setattr__(self, attr, v)
 
     def _set(self, **kwargs):
         """backend method to set attributes"""
@@ -282,52 +472,75 @@ class _BaseOutput(object):
                     if v is not None:
                         self.__setattr__(k, v)
 
-    # pylint: disable=R0912
-    def export(self):
+    def __setattr__(self, name, value):
+        if self._shared:
+            raise AttributeError("shared {} is immutable, use a copy instead"
+                                 .format(type(self).__name__))
+        object.__setattr__(self, name, value)
+        if isinstance(value, _BaseOutput) and name != "_parent":
+            self._adopt(value)
+        else:
+            self._invalidate()
+
+    def _adopt(self, child):
+        """register self as the parent of child, whose export is part of the export of self.
+
+        Shared child has no parent, since it never changes"""
+        if not child._shared:
+            object.__setattr__(child, "_parent", self)
+        self._invalidate()
+
+    def _invalidate(self):
+        """drop the cached export, and other caches in _caches, of the object and its parents"""
+        obj = self
+        while obj is not None:
+            for name in obj._caches:
+                object.__setattr__(obj, name, None)
+            obj = obj._parent
+
+    def export(self, minimal=False):
         """export all object attributes as a list of string
 
-        Each member is a line in agr file"""
-        slist = []
-        prefix = deepcopy(self._marker).replace("_", " ")
-        try:
-            affix = self.__getattribute__('_affix')
-            is_p = self.__getattribute__('_is_prefix')
-            if is_p:
-                prefix = str(affix) + prefix
-            else:
-                prefix += str(affix)
-        except (TypeError, AttributeError):
-            pass
-
-        for attr, (typ, _, f) in self._attrs.items():
-            attrv = self.__getattribute__(attr)
-            if typ in [list, tuple, set]:
-                temps = attr.replace("_", " ") + " " + f.format(*attrv)
-            # special property marked by the type as bool
-            elif typ is bool:
-                # for Symbol
-                if attr == "type":
-                    temps = f.format(attrv)
-                # for on off attribute
-                if attr.endswith("_switch"):
-                    temps = attr.replace("_switch", "") + " " + Switch.get_str(attrv)
-                # for inout attribute
-                elif attr.endswith("_pointing"):
-                    temps = attr.replace("_pointing", "") + " " + Pointing.get_str(attrv)
-                elif attr.endswith("_placement"):
-                    temps = attr.replace("_placement", "") + " " + Placement.get_str(attrv)
-                # for location-like attribute
-                elif attr.endswith("_location"):
-                    temps = attr.replace("_location", "") + " " + f.format(*attrv)
-                # for arbitray string attribute
-                elif attr.endswith("_comment"):
-                    temps = attr.replace("_comment", "") + " " + encode_string(f.format(attrv))
-                # remove the marker name in the attribute to avoid duplicate
-                temps = temps.replace(self._marker, "").replace("_", " ")
+        Each member is a line in agr file
+
+        Args:
+            minimal (bool) : omit the attributes which have the default values of Grace
+        """
+        cache = self._export_cache
+        if cache is None:
+            cache = {}
+            object.__setattr__(self, "_export_cache", cache)
+        slist = cache.get(minimal)
+        if slist is None:
+            slist = self._export(minimal)
+            cache[minimal] = slist
+        return list(slist)
+
+    def _is_inert(self):
+        """check if the object is not drawn by its _inert_switch"""
+        if self._inert_switch is None:
+            return False
+        attr, v = self._inert_switch
+        return self.__getattribute__(attr) == v
+
+    def _export(self, minimal=False):
+        """backend of export, which generates the lines without cache"""
+        prefix = self._export_prefix
+        if self._has_affix:
+            if self._is_prefix:
+                prefix = self._affix + prefix
             else:
-                temps = attr.replace("_", " ") + " " + f.format(attrv)
-            s = prefix + " " + temps
-            slist.append(s)
+                prefix += self._affix
+        values = map(self.__getattribute__, self._export_attrs)
+        if not minimal:
+            slist = [prefix + f(v) for f, v in zip(self._exporters, values)]
+        elif self._is_inert():
+            attr, v = self._inert_switch
+            slist = [prefix + self._exporters[self._export_attrs.index(attr)](v),]
+        else:
+            slist = [prefix + f(v) for f, v, d in
+                     zip(self._exporters, values, self._grace_default_values)
+                     if d is _NO_DEFAULT or type(v) is not type(d) or v != d]
 
         # cover extra lines with an _extra_export attribute
         try:
@@ -337,6 +550,11 @@ class _BaseOutput(object):
 
         return slist
 
+    def iter_export(self, minimal=False):
+        """iterate over the exported lines. See export"""
+        for s in self.export(minimal):
+            yield s
+
     def __str__(self):
         return "\n".join(self.export())
 
@@ -346,6 +564,7 @@ class _BaseOutput(object):
 
 class _Region(_BaseOutput, _Affix):
     """Region of plot, i.e. the `r` part"""
+    __slots__ = ("_link_ig",)
     _marker = 'r'
     _attrs = {
         'r_switch': (bool, Switch.OFF, '{:s}'),
@@ -355,6 +574,7 @@ class _Region(_BaseOutput, _Affix):
         'color': (int, Color.BLACK, '{:d}'),
         'line': (list, [0., 0., 0., 0.], '{:f}, {:f}, {:f}, {:f}'),
         }
+    _inert_switch = ("r_switch", Switch.OFF)
 
     def __init__(self, index, **kwargs):
         _BaseOutput.__init__(self, **kwargs)
@@ -365,10 +585,11 @@ class _Region(_BaseOutput, _Affix):
         """set the graph to which the region is linked to"""
         self._link_ig = str(ig)
 
-    def export(self):
-        """export as a list of string"""
+    def _export(self, minimal=False):
+        if minimal and self._is_inert():
+            return _BaseOutput._export(self, minimal)
         slist = ["link " + self._marker + self._affix + " to g" + self._link_ig]
-        slist += _BaseOutput.export(self)
+        slist += _BaseOutput._export(self, minimal)
         return slist
 
 class _TitleLike(_BaseOutput):
@@ -399,7 +620,7 @@ class _WorldLike(_BaseOutput):
     _marker = ''
 
     def get(self):
-        return self.__getattribute__(self._marker + '_location')
+        return list(self.__getattribute__(self._marker + '_location'))
 
     def set(self, loc):
         self.__setattr__(self._marker + '_location', loc)
@@ -414,6 +635,7 @@ class _Line(_BaseOutput):
         'color': (int, Color.BLACK, "{:d}"),
         'pattern': (int, 1, "{:d}"),
         }
+    _grace_defaults = {'type': LineType.STRAIGHT,}
 
 class _Box(_BaseOutput):
     """Box of legend for internal use"""
@@ -443,6 +665,14 @@ class _Legend(_BaseOutput):
         'invert': (str, False, '{:s}'),
         'char_size': (float, 1.2, '{:8f}'),
         }
+    _grace_defaults = {
+        'legend_switch': Switch.ON,
+        'loctype': 'view',
+        'length': 4,
+        'vgap': 1,
+        'hgap': 1,
+        'invert': "False",
+        }
 
 class _Frame(_BaseOutput, _IntMap):
     """frame"""
@@ -470,6 +700,7 @@ class _Frame(_BaseOutput, _IntMap):
         'background_color': (int, Color.WHITE, "{:d}"),
         'background_pattern': (int, 0, "{:d}"),
         }
+    _grace_defaults = {'type': 0, 'background_pattern': 0,}
 
 class _BaseLine(_BaseOutput):
     """baseline of dataset"""
@@ -478,6 +709,8 @@ class _BaseLine(_BaseOutput):
         'type': (int, BaseLineType.ZERO, '{:d}'),
         'baseline_switch': (bool, Switch.OFF, '{:s}'),
         }
+    _grace_defaults = {'type': 0,}
+    _inert_switch = ("baseline_switch", Switch.OFF)
 
 class _DropLine(_BaseOutput):
     """baseline of dataset"""
@@ -485,6 +718,7 @@ class _DropLine(_BaseOutput):
     _attrs = {
         'dropline_switch': (bool, Switch.OFF, '{:s}'),
         }
+    _grace_defaults = {'dropline_switch': Switch.OFF,}
 
 
 class _Fill(_BaseOutput, _IntMap):
@@ -504,6 +738,7 @@ class _Fill(_BaseOutput, _IntMap):
         'color': (int, Color.BLACK, '{:d}'),
         'pattern': (int, Pattern.SOLID, '{:d}'),
         }
+    _grace_defaults = {'type': 0, 'rule': 0,}
 
 class _Default(_BaseOutput):
     """_Default options at head"""
@@ -552,6 +787,7 @@ class _Annotation(_BaseOutput):
         "prepend": (str, "\"\"", "{:s}"),
         "offset": (list, [0.0, 0.0], "{:8f} , {:8f}"),
         }
+    _inert_switch = ("avalue_switch", Switch.OFF)
 
 class _Symbol(_BaseOutput, _IntMap):
     """Symbols of marker"""
@@ -596,6 +832,7 @@ class _Symbol(_BaseOutput, _IntMap):
         "char_font": (int, 0, "{:d}"),
         "skip": (int, 0, "{:d}"),
         }
+    _grace_defaults = {'skip': 0,}
 
 
 class _Page(_BaseOutput):
@@ -619,10 +856,12 @@ class _TimesStamp(_BaseOutput):
         'char_size': (float, 1.0, "{:8f}"),
         'def': (str, time.strftime("%a %b %d %H:%M:%S %Y"), "\"{:s}\""),
         }
+    _inert_switch = ("timestamp_switch", Switch.OFF)
 
 class _Tick(_BaseOutput):
     """Tick of axis
     """
+    __slots__ = ("spec_ticks", "spec_labels", "spec_majors")
     _marker = 'tick'
     _attrs = {
         'tick_switch': (bool, Switch.ON, "{:s}"),
@@ -644,6 +883,17 @@ class _Tick(_BaseOutput):
         'place_placement': (bool, Placement.BOTH, "{:s}"),
         'spec_type': (str, None, "{:s}"),
         }
+    _grace_defaults = {
+        'tick_switch': Switch.ON,
+        'tick_pointing': Pointing.IN,
+        'default': 6,
+        'major_size': 1.0,
+        'major_grid_switch': Switch.OFF,
+        'minor_size': 0.5,
+        'minor_ticks': 1,
+        'minor_grid_switch': Switch.OFF,
+        'place_placement': Placement.BOTH,
+        }
 
     def __init__(self, **kwargs):
         _BaseOutput.__init__(self, **kwargs)
@@ -651,8 +901,8 @@ class _Tick(_BaseOutput):
         self.spec_labels = []
         self.spec_majors = []
 
-    def export(self):
-        slist = _BaseOutput.export(self)
+    def _export(self, minimal=False):
+        slist = _BaseOutput._export(self, minimal)
         if self.__getattribute__("spec_type") in ["ticks", "both"]:
             slist.append("{:s} spec {:d}".format(self._marker, len(self.spec_ticks)))
             for i, (loc, m) in enumerate(zip(self.spec_ticks, self.spec_majors)):
@@ -673,6 +923,7 @@ class _Bar(_BaseOutput):
         'linestyle': (int, LineStyle.SOLID, '{:d}'),
         'linewidth': (float, 1.5, '{:3.1f}'),
         }
+    _grace_defaults = {'bar_switch': Switch.ON,}
 
 class _Label(_BaseOutput):
     """Axis label"""
@@ -686,6 +937,11 @@ class _Label(_BaseOutput):
         'color': (int, Color.BLACK, "{:d}"),
         'place_placement': (bool, Placement.NORMAL, "{:s}"),
         }
+    _grace_defaults = {
+        'layout': 'para',
+        'place': 'auto',
+        'place_placement': Placement.NORMAL,
+        }
 
 class _TickLabel(_BaseOutput):
     """Label of axis tick"""
@@ -711,6 +967,24 @@ class _TickLabel(_BaseOutput):
         'stop': (float, 0.0, "{:8f}"),
         'char_size': (float, 1.5, "{:8f}"),
         }
+    _grace_defaults = {
+        'ticklabel_switch': Switch.ON,
+        'format': "general",
+        'formula': "",
+        'append': "",
+        'prepend': "",
+        'prec': 5,
+        'angle': 0,
+        'skip': 0,
+        'stagger': 0,
+        'place_placement': Placement.NORMAL,
+        'offset_switch': Switch.AUTO,
+        'offset': [0.00, 0.01],
+        'start_type_switch': Switch.AUTO,
+        'start': 0.0,
+        'stop_type_switch': Switch.AUTO,
+        'stop': 0.0,
+        }
 
 class _Errorbar(_BaseOutput):
     """Errorbar of dataset"""
@@ -728,6 +1002,12 @@ class _Errorbar(_BaseOutput):
         'riser_clip_switch': (bool, Switch.OFF, '{:s}'),
         'riser_clip_length': (float, 0.1, '{:8f}'),
         }
+    _grace_defaults = {
+        'errorbar_switch': Switch.ON,
+        'place_placement': Placement.BOTH,
+        'riser_clip_switch': Switch.OFF,
+        'riser_clip_length': 0.1,
+        }
 
 class _Axis(_BaseOutput, _Affix):
     """Axis of graph
@@ -738,6 +1018,7 @@ class _Axis(_BaseOutput, _Affix):
         'type': (list, ["zero", "false"], '{:s} {:s}'),
         'offset': (list, [0.0, 0.0], '{:8f} , {:8f}'),
         }
+    _grace_defaults = {'type': ['zero', 'false'], 'offset': [0.0, 0.0],}
     def __init__(self, axis, **kwargs):
         assert axis in ['x', 'y', 'altx', 'alty']
         _BaseOutput.__init__(self, **kwargs)
@@ -754,6 +1035,7 @@ class _Axes(_BaseOutput, _Affix):
         'scale': (str, 'Normal', "{:s}"),
         'invert_switch': (bool, Switch.OFF, "{:s}")
         }
+    _grace_defaults = {'scale': 'Normal', 'invert_switch': Switch.OFF,}
     def __init__(self, axes, **kwargs):
         assert axes in ['x', 'y']
         _BaseOutput.__init__(self, **kwargs)
@@ -768,6 +1050,7 @@ class _Dataset(_BaseOutput, _Affix):
         'legend': (str, "", "\"{:s}\""),
         'comment': (str, "", "\"{:s}\""),
         }
+    _grace_defaults = {'hidden': "False", 'legend': "", 'comment': "",}
     def __init__(self, index, **kwargs):
         _BaseOutput.__init__(self, **kwargs)
         _Affix.__init__(self, index, is_prefix=False)
@@ -852,6 +1135,7 @@ class _DrawEllipse(_BaseOutput):
 class _Graph(_BaseOutput, _Affix):
     """Graph object, similar to Axes in matplotlib
     """
+    __slots__ = ("_index",)
     _marker = 'g'
     _attrs = {
         'hidden': (str, False, '{:s}'),
@@ -864,6 +1148,17 @@ class _Graph(_BaseOutput, _Affix):
         'fixedpoint_format': (list, ['general', 'general'], '{:s} {:s}'),
         'fixedpoint_prec': (list, [6, 6], '{:d}, {:d}'),
         }
+    # hidden is always kept, so that the graph is created by Grace
+    _grace_defaults = {
+        'type': "XY",
+        'stacked': "False",
+        'bar_hgap': 0.0,
+        'fixedpoint_switch': Switch.OFF,
+        'fixedpoint_type': 0,
+        'fixedpoint_xy': [0.0, 0.0],
+        'fixedpoint_format': ["general", "general"],
+        'fixedpoint_prec': [6, 6],
+        }
     def __init__(self, index, **kwargs):
         self._index = index
         _BaseOutput.__init__(self, **kwargs)
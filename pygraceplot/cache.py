@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""content-addressed cache of figures rendered by gracebat"""
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from pygraceplot.commands import run_gracebat_file
+
+try:
+    from pygraceplot.__config__ import render_cache_dir
+except ImportError:
+    render_cache_dir = None
+try:
+    from pygraceplot.__config__ import render_cache_size
+except ImportError:
+    render_cache_size = 1 << 30
+
+_default_cache = None
+
+
+class RenderCache:
+    """Cache of rendered figures, keyed by the hash of agr content and device
+
+    Entries are evicted in least-recently-used order when their total size exceeds `max_size`.
+
+    Args:
+        directory (str) : directory to store the cached figures. Created if not existing
+        max_size (int) : maximal total size of cached figures in bytes
+        hardlink (bool) : hardlink the cached figure to the target on hit, instead of copying.
+            Note that a linked figure changed in place changes the cache entry as well
+
+    Attributes:
+        hits (int) : number of figures taken from the cache
+        misses (int) : number of figures rendered by gracebat
+    """
+    def __init__(self, directory, max_size=None, hardlink=False):
+        if max_size is None:
+            max_size = render_cache_size
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.hardlink = hardlink
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def render(self, chunks, figname, device, timeout=None, skip=None):
+        """render agr chunks to figname, or take it from the cache
+
+        The chunks are written to a temporary agr file while being hashed,
+        which is then passed to gracebat on a miss.
+
+        Args:
+            chunks (Iterable of str) : content of agr file
+            figname, device, timeout : see commands.run_gracebat
+            skip (str) : chunks starting with `skip` are excluded from the hash
+
+        Returns:
+            bool, True if the figure is taken from the cache
+        """
+        h = hashlib.sha256()
+        fd, pagr = tempfile.mkstemp(suffix=".agr")
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                for chunk in chunks:
+                    fp.write(chunk)
+                    if skip is None or not chunk.startswith(skip):
+                        h.update(chunk.encode())
+            h.update(device.encode())
+            key = h.hexdigest()
+            if self.fetch(key, figname):
+                return True
+            run_gracebat_file(pagr, figname, device, timeout=timeout)
+            self.store(key, figname)
+            return False
+        finally:
+            os.remove(pagr)
+
+    def fetch(self, key, figname):
+        """place the cached figure of `key` at figname
+
+        Returns:
+            bool, False if key is not cached
+        """
+        path = self._path(key)
+        try:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(path)
+            self._place(path, figname)
+            # mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            # not cached, or evicted in between
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def _place(self, path, figname):
+        """copy or link the cached figure at path to figname"""
+        if os.path.lexists(figname):
+            os.remove(figname)
+        if self.hardlink:
+            try:
+                os.link(path, figname)
+                return
+            except FileNotFoundError:
+                raise
+            except OSError:
+                # e.g. across file systems, fall back to copy
+                pass
+        shutil.copyfile(path, figname)
+
+    def store(self, key, figname):
+        """store the rendered figure figname as the entry of `key`"""
+        fd, tmp = tempfile.mkstemp(prefix=".", dir=self.directory)
+        os.close(fd)
+        shutil.copyfile(figname, tmp)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def _entries(self):
+        """list of (mtime, size, path) of cached figures"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            path = self._path(name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    @property
+    def size(self):
+        """total size of cached figures in bytes"""
+        return sum(e[1] for e in self._entries())
+
+    def evict(self):
+        """remove the least recently used figures until the total size is within max_size"""
+        entries = sorted(self._entries())
+        total = sum(e[1] for e in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """remove all cached figures and reset counters"""
+        for _, _, path in self._entries():
+            os.remove(path)
+        self.hits = 0
+        self.misses = 0
+
+
+def get_default_cache():
+    """get the default render cache used by Plot.savefig
+
+    It is set by set_default_cache, or created from `render_cache_dir` in the rc file.
+    None if neither is available, i.e. caching is disabled.
+    """
+    global _default_cache
+    if _default_cache is None and render_cache_dir is not None:
+        _default_cache = RenderCache(os.path.expanduser(render_cache_dir))
+    return _default_cache
+
+
+def set_default_cache(cache):
+    """set the default render cache
+
+    Args:
+        cache (RenderCache or None) : None to disable caching
+    """
+    global _default_cache, render_cache_dir
+    _default_cache = cache
+    if cache is None:
+        render_cache_dir = None
@@ -1,6 +1,15 @@
 # -*- coding: utf-8 -*-
 """check grace command line"""
+import os
+import asyncio
 import subprocess as sp
+from asyncio import subprocess as asp
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pygraceplot.utils import get_file_ext
 try:
     from shutil import which
     has_gracebat = which("gracebat")
@@ -25,14 +34,390 @@ ext2device = {
     "jpeg": "JPEG",
     }
 
-def run_gracebat(agr_str, filename, device):
-    """run a gracebat command for figure exporting"""
+
+def get_device(figname, device=None):
+    """get the gracebat device for figure file `figname` from its extension
+
+    Args:
+        figname (str)
+        device (str) : if set, it is returned directly
+    """
+    if device is not None:
+        return device
+    ext = get_file_ext(figname)
+    try:
+        return ext2device[ext.lower()]
+    except KeyError:
+        raise ValueError("Unsupported device for extension {}".format(ext))
+
+try:
+    from pygraceplot.__config__ import gracebat_timeout
+except ImportError:
+    gracebat_timeout = None
+try:
+    from pygraceplot.__config__ import max_gracebat
+except ImportError:
+    max_gracebat = os.cpu_count() or 1
+
+
+class _GracebatSlots(object):
+    """counter of gracebat children running at the same time
+
+    The counter is shared by threads and by coroutines of any event loop,
+    so that max_gracebat holds for synchronous and asynchronous runs together.
+    Use it by `with` in threads and by `async with` in coroutines.
+
+    Args:
+        n (int) : maximal number of gracebat children
+    """
+    def __init__(self, n):
+        self._n = n
+        self._running = 0
+        self._cond = threading.Condition()
+        # (loop, future) of the coroutines waiting for a free slot
+        self._waiters = []
+
+    def set_limit(self, n):
+        """change the maximal number. Running children are still counted"""
+        with self._cond:
+            self._n = n
+        self._wake()
+
+    def acquire(self):
+        """wait for a free slot in the current thread and take it"""
+        with self._cond:
+            while self._running >= self._n:
+                self._cond.wait()
+            self._running += 1
+
+    async def aacquire(self):
+        """wait for a free slot in the running event loop and take it"""
+        loop = _get_loop()
+        while True:
+            with self._cond:
+                if self._running < self._n:
+                    self._running += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                await waiter[1]
+            finally:
+                with self._cond:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+
+    def release(self):
+        """free a slot taken by acquire or aacquire"""
+        with self._cond:
+            self._running -= 1
+        self._wake()
+
+    def _wake(self):
+        """let waiting threads and coroutines compete for the free slots"""
+        with self._cond:
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_set_done, future)
+            except RuntimeError:
+                # the loop is closed
+                pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def _set_done(future):
+    """wake a coroutine waiting on `future`"""
+    if not future.done():
+        future.set_result(None)
+
+
+_gracebat_slots = _GracebatSlots(max_gracebat)
+
+
+def _get_loop():
+    """get the event loop running the current coroutine
+
+    asyncio.get_running_loop is new in Python 3.7. Before that,
+    get_event_loop returns the running loop when called from a coroutine.
+    """
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:
+        return asyncio.get_event_loop()
+
+
+def set_max_gracebat(n):
+    """set the maximal number of gracebat processes running at the same time
+
+    Args:
+        n (int)
+    """
+    global max_gracebat
+    if n < 1:
+        raise ValueError("at least one gracebat process should be allowed, got", n)
+    max_gracebat = n
+    _gracebat_slots.set_limit(n)
+
+
+def run_gracebat(agr, filename, device, timeout=None):
+    """run a gracebat command for figure exporting
+
+    The call returns after gracebat has exited and the figure file is written.
+    At most `max_gracebat` gracebat processes are run at the same time,
+    further calls wait for a free slot.
+
+    Args:
+        agr (str or Iterable of str) : content of the agr file, or its chunks.
+            Chunks are encoded and fed to stdin of gracebat one by one as they
+            are generated, so that rendering can start before the whole agr is serialized
+        filename (str) : name of the figure file
+        device (str) : hardcopy device of gracebat, see ext2device
+        timeout (float) : seconds before gracebat is killed.
+            Default to gracebat_timeout, None for no limit
+
+    Raises:
+        FileNotFoundError : gracebat is not found, or the figure is not written.
+            An existing `filename` is removed before gracebat starts
+        subprocess.TimeoutExpired : gracebat is killed after timeout
+        subprocess.CalledProcessError : gracebat exits with non-zero code
+
+    Returns:
+        subprocess.CompletedProcess, with the stderr of gracebat as str
+    """
+    if isinstance(agr, str):
+        agr = [agr,]
+    return _run_gracebat(_gracebat_cmds(filename, device, "-pipe"), agr, filename, timeout)
+
+
+def run_gracebat_file(pagr, filename, device, timeout=None):
+    """run a gracebat command to export an existing agr file to figure
+
+    Args:
+        pagr (str) : path to the agr file
+        filename, device, timeout : see run_gracebat
+    """
+    if not os.path.isfile(pagr):
+        raise FileNotFoundError("agr file {} is not found".format(pagr))
+    return _run_gracebat(_gracebat_cmds(filename, device, pagr), None, filename, timeout)
+
+
+def _gracebat_cmds(filename, device, source):
+    """command line of gracebat to print `source` to `filename`"""
     if has_gracebat is None:
         raise FileNotFoundError("gracebat is not found in PATH")
-    cmds = [has_gracebat, "-hardcopy",
+    return [has_gracebat, "-hardcopy",
             "-hdevice", device,
             "-printfile", filename,
-            "-pipe"]
-    p = sp.Popen(cmds, stdin=sp.PIPE)
-    p.stdin.write(agr_str.encode())
+            source]
+
+
+def _run_gracebat(cmds, chunks, filename, timeout):
+    """run gracebat in one of the slots and wait for it, feeding chunks to its stdin.
+
+    stderr is collected in a temporary file, so that gracebat never blocks
+    on a full stderr pipe while stdin is being fed.
+    """
+    if timeout is None:
+        timeout = gracebat_timeout
+    with _gracebat_slots:
+        _remove_target(filename)
+        return _wait_gracebat(cmds, chunks, filename, timeout)
+
+
+def _remove_target(filename):
+    """remove a figure left by an earlier run, so that only a fresh figure passes the check"""
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+def _wait_gracebat(cmds, chunks, filename, timeout):
+    """backend of _run_gracebat. Set chunks to None when no input is needed"""
+    killed = []
+
+    def kill():
+        killed.append(True)
+        p.kill()
+
+    with tempfile.TemporaryFile() as err:
+        p = sp.Popen(cmds, stdin=sp.DEVNULL if chunks is None else sp.PIPE,
+                     stdout=sp.DEVNULL, stderr=err)
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+        try:
+            try:
+                if chunks is not None:
+                    for b in _iter_encoded(chunks):
+                        p.stdin.write(b)
+                    p.stdin.close()
+            except BrokenPipeError:
+                # gracebat exits early. The reason is left to its exit code
+                pass
+            returncode = p.wait()
+        except BaseException:
+            p.kill()
+            p.wait()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        err.seek(0)
+        stderr = err.read().decode(errors="replace")
+    return _check_gracebat(cmds, returncode, stderr, filename, timeout if killed else None)
+
+
+def _check_gracebat(cmds, returncode, stderr, filename, timeout=None):
+    """check the outcome of a finished gracebat process
+
+    Args:
+        timeout (float) : the timeout after which the process has been killed, if it was
+    """
+    if timeout is not None:
+        raise sp.TimeoutExpired(cmds, timeout, stderr=stderr)
+    if returncode != 0:
+        raise sp.CalledProcessError(returncode, cmds, stderr=stderr)
+    if not os.path.isfile(filename):
+        raise FileNotFoundError("gracebat did not write {}: {}".format(filename, stderr))
+    return sp.CompletedProcess(cmds, returncode, stderr=stderr)
+
+
+def _iter_encoded(chunks, size=65536):
+    """join and encode the chunks of str into bytes of at least `size`, except the last"""
+    buf = []
+    n = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        n += len(chunk)
+        if n >= size:
+            yield "".join(buf).encode()
+            buf = []
+            n = 0
+    if buf:
+        yield "".join(buf).encode()
+
+
+async def arun_gracebat(agr, filename, device, timeout=None):
+    """coroutine version of run_gracebat
+
+    gracebat is run by asyncio subprocess, while serialization, i.e. iteration
+    over the chunks of `agr`, is done in the default executor of the loop.
+    The slots of gracebat processes are shared with run_gracebat and other
+    event loops, so at most `max_gracebat` processes are run in total.
+
+    See run_gracebat for arguments, raises and return.
+    """
+    cmds = _gracebat_cmds(filename, device, "-pipe")
+    if isinstance(agr, str):
+        agr = [agr,]
+    if timeout is None:
+        timeout = gracebat_timeout
+    loop = _get_loop()
+    async with _gracebat_slots:
+        _remove_target(filename)
+        p = await asyncio.create_subprocess_exec(*cmds, stdin=asp.PIPE, stdout=asp.DEVNULL,
+                                                 stderr=asp.PIPE)
+        err = asyncio.ensure_future(p.stderr.read())
+
+        async def feed():
+            encoded = _iter_encoded(agr)
+            try:
+                while True:
+                    b = await loop.run_in_executor(None, next, encoded, None)
+                    if b is None:
+                        break
+                    p.stdin.write(b)
+                    await p.stdin.drain()
+                p.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                # gracebat exits early. The reason is left to its exit code
+                pass
+            return await p.wait()
+
+        killed = None
+        try:
+            try:
+                returncode = await asyncio.wait_for(feed(), timeout)
+            except asyncio.TimeoutError:
+                killed = timeout
+            finally:
+                if p.returncode is None:
+                    p.kill()
+                    returncode = await p.wait()
+            stderr = (await err).decode(errors="replace")
+        finally:
+            # the reader is left pending if the coroutine is cancelled
+            if not err.done():
+                err.cancel()
+                try:
+                    await err
+                except asyncio.CancelledError:
+                    pass
+    return _check_gracebat(cmds, returncode, stderr, filename, killed)
+
+
+RenderResult = namedtuple("RenderResult", ["figname", "device", "ok", "elapsed", "error"])
+RenderResult.__doc__ = """status of a rendering job in render_many
+
+Attributes:
+    figname (str)
+    device (str)
+    ok (bool) : True if the figure is written
+    elapsed (float) : wall time of the job in seconds
+    error (Exception) : the error raised by the job, None if ok
+"""
+
+
+def render_many(jobs, workers=None, timeout=None):
+    """render many figures with gracebat running in parallel
+
+    Args:
+        jobs (Iterable) : each job is a tuple (source, figname) or (source, figname, device).
+            source is either an object with `iter_export`, e.g. a Plot, or the path to an agr file.
+            device is determined from the extension of figname if not specified
+        workers (int) : number of jobs to run at the same time. Default to max_gracebat.
+            Note that the number of gracebat processes is also capped by max_gracebat
+        timeout (float) : timeout of each gracebat process. See run_gracebat
+
+    Returns:
+        list of RenderResult, in the order of jobs. Failed jobs do not raise
+    """
+    if workers is None:
+        workers = max_gracebat
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render_job, timeout, *job) for job in jobs]
+        return [f.result() for f in futures]
+
 
+def _render_job(timeout, source, figname, device=None):
+    """run a single job of render_many and return its RenderResult"""
+    start = time.time()
+    error = None
+    try:
+        device = get_device(figname, device)
+        if hasattr(source, "iter_export"):
+            run_gracebat((s + "\n" for s in source.iter_export()), figname, device,
+                         timeout=timeout)
+        else:
+            run_gracebat_file(source, figname, device, timeout=timeout)
+    # pylint: disable=W0703
+    except Exception as err:
+        error = err
+    return RenderResult(figname, device, error is None, time.time() - start, error)
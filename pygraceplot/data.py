@@ -1,15 +1,34 @@
 # -*- coding: utf-8 -*-
 """helper function in dealing with data, digits and mathematics"""
+try:
+    from os import PathLike
+except ImportError:
+    PathLike = str
+from re import compile as re_compile
 import numpy as np
 
+# single-number format specs which printf-style formatting renders identically
+_FORM_PATTERN = re_compile(r"^\{:([+ ]?)(#?)(0?)(\d*)(\.\d+)?([eEfFgG])\}$")
+# number of lines formatted at once by the bulk formatter
+CHUNK_SIZE = 10000
+# number of values reduced at once when scanning a column for its extremes or validity
+SCAN_SIZE = 1 << 20
+# maximal number of characters of formatted x kept by a DataGroup
+TEMPLATE_CACHE_SIZE = 1 << 24
+
 class Data(object):
     """Object for storage and extraction of data
 
     Args:
-        x, y, z (array-like) : positional, data columns in order
+        x, y, z (array-like) : positional, data columns in order.
+            The path to a .npy file is loaded as a read-only memory map.
+            Masked arrays are accepted, see valid_mask
         datatype (str) : the data type. See datatypes
         label (str)
         comment (str) : extra comment for the data
+        group (DataGroup) : the group sharing the abscissa. x must be the x of the group
+        maxlen (int) : maximal number of data points. If set, data points appended
+            beyond it push out the oldest ones, see append. It cannot be used with group
         error should be parsed by using keywords arguments, supported are
             dx
             dxl (l means lower)
@@ -47,37 +66,273 @@ class Data(object):
         'xydxdxdydy': (2, ['dx', 'dxl', 'dy', 'dyl']),
         }
     available_types = tuple(DATATYPES.keys())
+    # attributes of which the change drops cached statistics
+    _columns = frozenset(['x', 'y'] + extra_data)
 
-    def __init__(self, x, y, datatype=None, label=None, comment=None, **extras):
+    def __init__(self, x, y, datatype=None, label=None, comment=None, group=None, maxlen=None,
+                 **extras):
+        if group is not None and x is not group.x:
+            raise ValueError("x of grouped data should be the x of the group")
+        if group is not None and maxlen is not None:
+            raise ValueError("grouped data cannot have maxlen, as x is shared")
+        if maxlen is not None and maxlen < 1:
+            raise ValueError("maxlen should be positive, got", maxlen)
+        x, y = _as_column(x, "x"), _as_column(y, "y")
+        # extra columns set to None are not given
+        extras = {k: _load_array(v) for k, v in extras.items() if v is not None}
+        if maxlen is not None:
+            x, y = x[-maxlen:], y[-maxlen:]
+            extras = {k: v[-maxlen:] for k, v in extras.items()}
         datatype, self._extra_cols = Data._check_data_consistency(x, y, datatype=datatype, **extras)
         if datatype.startswith("bar") or datatype.startswith("xy"):
             self.x, self.y = x, y
-            self.x = np.array(self.x)
-            self.y = np.array(self.y)
             self._data_cols = ['x', 'y']
         else:
             raise ValueError("Unsupported datatype", datatype)
         for opt in self._extra_cols:
-            self.__setattr__(opt, extras[opt])
+            self.__setattr__(opt, _as_column(extras[opt], opt, len(self.x)))
         self.label = label
         self.comment = comment
         self.datatype = datatype
+        self._group = group
+        self._maxlen = maxlen
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._columns:
+            group = self.__dict__.get("_group")
+            if name == "x" and group is not None and value is not group.x:
+                # no longer share x with the group
+                object.__setattr__(self, "_group", None)
+            self._changed()
+
+    def _changed(self):
+        """drop the cached statistics and buffers, and notify the parent"""
+        object.__setattr__(self, "_stats", {})
+        object.__setattr__(self, "_buffers", None)
+        object.__setattr__(self, "_text", None)
+        self._notify()
+
+    def _notify(self):
+        """invalidate the caches of the parent, if any"""
+        parent = self.__dict__.get("_parent")
+        if parent is not None:
+            parent._invalidate()
+
+    def append(self, x, y, **extras):
+        """append data points at the end
+
+        The columns are moved to buffers on the first call, which grow by doubling,
+        so that appending takes amortized time of the appended points only.
+        With maxlen, the oldest points are pushed out and the buffers are of fixed size.
+        The cached statistics are updated with the new points, and the exported lines
+        are cached so that only the new points are formatted on next export.
+
+        The data columns are views of the buffers. They are replaced after each call
+        and should not be kept by the caller. Masked values are stored as NaN.
+
+        Args:
+            x, y (array-like or number)
+            keyword arguments : the extra columns, the same as those of the datatype
+        """
+        if self._group is not None:
+            raise ValueError("data sharing x with a group cannot be appended")
+        names = self._data_cols + self._extra_cols
+        extras.update(x=x, y=y)
+        if sorted(extras) != sorted(names):
+            raise ValueError("columns to append should be", names)
+        new = {}
+        for name in names:
+            c = np.atleast_1d(np.asanyarray(extras[name]))
+            if np.ma.isMaskedArray(c):
+                c = np.ma.filled(c.astype(float), np.nan)
+            new[name] = _as_column(c, name, len(new["x"]) if new else None)
+        m = len(new["x"])
+        if self._buffers is None:
+            self._init_buffers()
+        buffers = self._buffers
+        start, stop = buffers["_range"]
+        evict = 0
+        if self._maxlen is not None:
+            if m > self._maxlen:
+                new = {k: v[-self._maxlen:] for k, v in new.items()}
+                m = self._maxlen
+            evict = max(0, stop - start + m - self._maxlen)
+        evicted = {k: buffers[k][start:start+evict] for k in names}
+        start += evict
+        capacity = len(buffers["x"])
+        dtypes = {name: np.result_type(buffers[name], new[name]) for name in names}
+        if stop + m > capacity or any(dtypes[k] != buffers[k].dtype for k in names):
+            # move the kept points to the front of new buffers, large enough for the new points
+            size = capacity
+            if stop - start + m > capacity:
+                size = max(2 * capacity, stop - start + m)
+            for name in names:
+                buf = np.empty(size, dtype=dtypes[name])
+                buf[:stop-start] = buffers[name][start:stop]
+                buffers[name] = buf
+            start, stop = 0, stop - start
+        for name in names:
+            buffers[name][stop:stop+m] = new[name]
+        buffers["_range"] = (start, stop + m)
+        for name in names:
+            object.__setattr__(self, name, buffers[name][start:stop+m])
+        self._update_stats(new, evicted)
+        self._update_text(evict)
+        self._notify()
+
+    def _init_buffers(self):
+        """move the data columns to buffers"""
+        names = self._data_cols + self._extra_cols
+        n = len(self.x)
+        if self._maxlen is None:
+            size = max(16, 2 * n)
+        else:
+            size = 2 * self._maxlen
+        buffers = {}
+        for name in names:
+            c = self.__getattribute__(name)
+            if np.ma.isMaskedArray(c):
+                c = np.ma.filled(c.astype(float), np.nan)
+            buf = np.empty(size, dtype=c.dtype)
+            buf[:n] = c
+            buffers[name] = buf
+        buffers["_range"] = (0, n)
+        object.__setattr__(self, "_buffers", buffers)
+
+    def _update_stats(self, new, evicted):
+        """update the cached statistics with the appended and evicted points"""
+        stats = self._stats
+        for key in list(stats):
+            if key == "valid":
+                continue
+            name, finite = key
+            low, high = stats[key]
+            if len(evicted[name]):
+                try:
+                    elow, ehigh = _extremes(evicted[name], finite)
+                except ValueError:
+                    pass
+                else:
+                    if not (elow > low and ehigh < high):
+                        del stats[key]
+                        continue
+            try:
+                nlow, nhigh = _extremes(new[name], finite)
+            except ValueError:
+                continue
+            # NaN is kept in the raw extremes, as in _extremes
+            if finite:
+                stats[key] = (np.fmin(low, nlow), np.fmax(high, nhigh))
+            else:
+                stats[key] = (np.minimum(low, nlow), np.maximum(high, nhigh))
+        if "valid" in stats:
+            valid = stats["valid"]
+            n = len(self.x)
+            m = len(new["x"])
+            tail = _valid_mask([new[k] for k in self._data_cols + self._extra_cols])
+            if valid is None and tail is None:
+                return
+            if valid is None:
+                valid = np.ones(n - m, dtype=bool)
+            else:
+                valid = valid[len(valid) - (n - m):]
+            if tail is None:
+                tail = np.ones(m, dtype=bool)
+            valid = np.concatenate([valid, tail])
+            # invalid points may have been pushed out
+            if len(evicted["x"]) and valid.all():
+                valid = None
+            stats["valid"] = valid
+
+    def _update_text(self, evict):
+        """drop the exported lines of the evicted points"""
+        text = self._text
+        if text is None or not evict:
+            return
+        chunks = list(text[1])
+        while evict and chunks:
+            nrows, block = chunks[0]
+            if evict >= nrows:
+                chunks.pop(0)
+                evict -= nrows
+            else:
+                chunks[0] = (nrows - evict, block.split("\n", evict)[-1])
+                evict = 0
+        object.__setattr__(self, "_text", (text[0], chunks))
+
+    def set_parent(self, parent):
+        """set the object whose `_invalidate` is called when a data column is replaced
+
+        Note that changes in place of the data arrays are not observed.
+        """
+        object.__setattr__(self, "_parent", parent)
 
-    def xmin(self):
+    def xmin(self, finite=False):
         """get the min value of abscissa"""
-        return self.x.min()
+        return self.xextremes(finite)[0]
 
-    def xmax(self):
+    def xmax(self, finite=False):
         """get the max value of abscissa"""
-        return self.x.max()
+        return self.xextremes(finite)[1]
 
-    def max(self):
+    def max(self, finite=False):
         """get the max value among data point"""
-        return self.y.max()
+        return self.extremes(finite)[1]
 
-    def min(self):
+    def min(self, finite=False):
         """get the min value among data point"""
-        return self.y.min()
+        return self.extremes(finite)[0]
+
+    def xextremes(self, finite=False):
+        """get the min and max value of abscissa
+
+        They are computed in a single pass and cached until x is replaced.
+
+        Args:
+            finite (bool) : if True, NaN and inf are ignored
+        """
+        return self._get_stats("x", finite)
+
+    def extremes(self, finite=False):
+        """get the min and max value among data point. See xextremes"""
+        return self._get_stats("y", finite)
+
+    def _get_stats(self, name, finite):
+        """get the cached extremes of column `name`"""
+        key = (name, finite)
+        v = self._stats.get(key)
+        if v is None:
+            v = _extremes(self.__getattribute__(name), finite)
+            self._stats[key] = v
+        return v
+
+    def valid_mask(self):
+        """get the mask of valid data points, i.e. finite and not masked in all columns
+
+        The mask is cached until any data column is replaced.
+
+        Returns:
+            1d bool array, or None if all data points are valid
+        """
+        if "valid" not in self._stats:
+            self._stats["valid"] = _valid_mask([self.__getattribute__(name) for name in
+                                                self._data_cols + self._extra_cols])
+        return self._stats["valid"]
+
+    def valid_runs(self):
+        """get the runs of consecutive valid data points
+
+        Returns:
+            2d int array, the start and stop of each run in a row
+        """
+        valid = self.valid_mask()
+        if valid is None:
+            return np.array([[0, len(self.x)]])
+        # bounds of the runs of valid and invalid points in turn
+        edges = np.concatenate([[0], np.flatnonzero(valid[1:] != valid[:-1]) + 1, [len(valid)]])
+        first = 0 if valid[0] else 1
+        return np.column_stack([edges[first:-1:2], edges[first+1::2]])
 
     def _get(self, data_cols, scale=1.0, transpose=False):
         """get all data value
@@ -96,7 +351,9 @@ class Data(object):
         d = np.stack([self.__getattribute__(arg) for arg in data_cols])
         if transpose:
             d = d.transpose()
-        return d * scale
+        if scale != 1:
+            d = d * scale
+        return d
 
     def _export(self, data_cols, form=None, transpose=False, sep=None):
         """export data/error to a list, each member as a line of string for data
@@ -123,14 +380,70 @@ class Data(object):
                 if Iterable, each form will be parsed respectively.
         """
         slist = []
+        for block in self._iter_export(data_cols, form=form, transpose=transpose, sep=sep):
+            slist.extend(block.split("\n"))
+        return slist
+
+    def _iter_export(self, data_cols, form=None, transpose=False, sep=None, index=None,
+                     mask=None):
+        """iterate over blocks of exported data/error lines
+
+        Each block is a string of one or more lines joined by newline.
+        See _export for arguments, and iter_export for index and mask.
+        """
         # check if format string is valid 
         if form is not None and isinstance(form, (tuple, list)):
             if len(form) != len(data_cols):
                 msg = "format string does not conform data columns"
                 raise ValueError(msg, form, len(data_cols))
+        if index is not None and mask is not None:
+            raise ValueError("index and mask cannot be set at the same time")
+
+        if mask is not None:
+            data_all = [self.__getattribute__(arg) for arg in data_cols]
+            if transpose:
+                return _iter_export_2d_data(data_all, transpose=True, form=form, sep=sep,
+                                            mask=mask)
+            # each column makes a single line, no block to mask
+            index = mask
+        if index is not None:
+            data_all = [self.__getattribute__(arg)[index] for arg in data_cols]
+            return _iter_export_2d_data(data_all, transpose=transpose, form=form, sep=sep)
+        if self._buffers is not None and transpose and \
+                data_cols == self._data_cols + self._extra_cols:
+            return self._iter_export_cached(form, sep)
+        if self._group is not None and transpose and data_cols == ['x', 'y']:
+            blocks = self._group._iter_export_y(self.y, form=form, sep=sep)
+            if blocks is not None:
+                return blocks
+        # pass the columns directly to avoid stacking all data at once
+        data_all = [self.__getattribute__(arg) for arg in data_cols]
+        return _iter_export_2d_data(data_all, transpose=transpose, form=form, sep=sep)
+
+    def _iter_export_cached(self, form, sep):
+        """iterate over the blocks of lines of appended data, formatting only the new points
 
-        data_all = self._get(data_cols)
-        return _export_2d_data(data_all, transpose=transpose, form=form, sep=sep)
+        The cache holds the format and a list of (number of lines, block),
+        which covers the leading points. The list is never changed in place,
+        but rebuilt and swapped in as a whole, so that exports running in
+        several threads at the same time always see a consistent cache.
+        """
+        key = (tuple(form) if isinstance(form, (list, tuple)) else form, sep)
+        text = self._text
+        chunks = [] if text is None or text[0] != key else list(text[1])
+        ncached = sum(nrows for nrows, _ in chunks)
+        data_all = [self.__getattribute__(arg)[ncached:] for arg in self._data_cols + self._extra_cols]
+        if len(data_all[0]):
+            for block in _iter_export_2d_data(data_all, transpose=True, form=form, sep=sep):
+                nrows = block.count("\n") + 1
+                if chunks and chunks[-1][0] + nrows <= CHUNK_SIZE:
+                    # merge small blocks of frequent appends
+                    nlast, last = chunks[-1]
+                    chunks[-1] = (nlast + nrows, last + "\n" + block)
+                else:
+                    chunks.append((nrows, block))
+        object.__setattr__(self, "_text", (key, chunks))
+        return iter([block for _, block in chunks])
 
     def get_data(self, transpose=False):
         """get all data values
@@ -221,6 +534,108 @@ class Data(object):
         return self._export(self._data_cols + self._extra_cols,
                             form=form, transpose=transpose, sep=sep)
 
+    def iter_export(self, form=None, transpose=False, sep=None, index=None, mask=None):
+        """Iterate over blocks of exported data and extras lines
+
+        Same as export, but lines are generated in blocks of at most CHUNK_SIZE lines,
+        each block as a string of lines joined by newline.
+
+        Args:
+            index (1d int array or slice) : if set, only the data points at index are exported
+            mask (1d bool array) : if set, only the data points where mask is True are exported.
+                Unlike index, the mask is applied block by block, so the data are not copied
+                in full. It cannot be used together with index
+        """
+        return self._iter_export(self._data_cols + self._extra_cols, form=form,
+                                 transpose=transpose, sep=sep, index=index, mask=mask)
+
+    def decimate_index(self, method, npixels, index=None):
+        """get the index of data points kept after decimation
+
+        The data points are divided into `npixels` buckets of consecutive points,
+        each supposed to cover one pixel of the rendered graph.
+
+        Args:
+            method (str) : decimation method
+                "minmax" : keep the points with min and max y in each bucket
+                "lttb" : largest-triangle-three-buckets, keep one point in each
+                    of 2 * `npixels` buckets
+            npixels (int) : number of pixels along x
+            index (1d int array) : if set, only the data points at index are decimated
+
+        Returns:
+            1d int array, or None if no point is dropped
+        """
+        try:
+            decimator = DECIMATORS[method]
+        except KeyError:
+            raise ValueError("Unknown decimation method", method)
+        return self._reduce_index(decimator, index, int(npixels))
+
+    def simplify_index(self, tolerance, xscale=1.0, yscale=1.0, index=None):
+        """get the index of data points kept after Douglas-Peucker simplification
+
+        Points closer than `tolerance` to the polyline through the kept points
+        are dropped, so that points on straight segments are dropped while corners kept.
+
+        Args:
+            tolerance (float) : maximal distance of a dropped point to the polyline
+            xscale, yscale (float) : the distance is measured after scaling x and y
+                with them, e.g. to view units
+            index (1d int array) : if set, only the data points at index are simplified
+
+        Returns:
+            1d int array, or None if no point is dropped
+        """
+        return self._reduce_index(_simplify_dp, index, tolerance, xscale, yscale)
+
+    def clip_index(self, xmin, ymin, xmax, ymax, index=None):
+        """get the index of data points kept after clipping to a box
+
+        Points outside the box are dropped, except those next to a point in
+        a different region around the box, i.e. inside or beyond another edge.
+        The line through the kept points thus leaves the box as the full data,
+        while the dropped points are connected only across the outside of the box.
+        A point is taken as inside if its error bar, or its bar from zero
+        for bar types, reaches into the box.
+
+        Args:
+            xmin, ymin, xmax, ymax (float) : the box, e.g. the world of graph
+            index (1d int array) : if set, only the data points at index are clipped
+
+        Returns:
+            1d int array, or None if no point is dropped
+        """
+        def column(name):
+            c = self.__getattribute__(name)
+            return c if index is None else c[index]
+        x, y = column("x"), column("y")
+        xlo, xhi = x, x
+        ylo, yhi = y, y
+        if "dx" in self._extra_cols:
+            xlo = x - column("dxl" if "dxl" in self._extra_cols else "dx")
+            xhi = x + column("dx")
+        if "dy" in self._extra_cols:
+            ylo = y - column("dyl" if "dyl" in self._extra_cols else "dy")
+            yhi = y + column("dy")
+        if self.datatype.startswith("bar"):
+            ylo, yhi = np.minimum(ylo, 0), np.maximum(yhi, 0)
+        kept = _clip_box(xlo, xhi, ylo, yhi, xmin, ymin, xmax, ymax)
+        if index is None:
+            return kept
+        if kept is None:
+            return index
+        return index[kept]
+
+    def _reduce_index(self, reducer, index, *args):
+        """apply the reducer of x and y to the data points at index"""
+        if index is None:
+            return reducer(self.x, self.y, *args)
+        kept = reducer(self.x[index], self.y[index], *args)
+        if kept is None:
+            return index
+        return index[kept]
+
     @classmethod
     def _check_data_consistency(cls, x, y, datatype=None, **extras):
         """check the consistency of input and also confirms the data type of input.
@@ -243,6 +658,9 @@ class Data(object):
         if ndp != len(y):
             raise ValueError("sizes of x and y data are different")
 
+        for e in extras:
+            if e not in cls.extra_data:
+                raise ValueError("Unknown extra data", e)
         # check extra data and detect the datatype
         extra_cols = []
         # automatic detect
@@ -251,7 +669,7 @@ class Data(object):
             for dt, (n, ec) in cls.DATATYPES.items():
                 if dt.startswith(t) and len(ec) == len(extras):
                     edata = [extras.get(required_e, None) for required_e in ec]
-                    find_all = all(edata)
+                    find_all = all(e is not None for e in edata)
                     if find_all:
                         size_consistent = all(map(lambda x: len(x) == ndp, edata))
                         if not size_consistent:
@@ -271,6 +689,403 @@ class Data(object):
         # some error is parsed
         return t, extra_cols
 
+class DataGroup(object):
+    """Columnar storage of several data sharing the same abscissa
+
+    x is stored once and formatted on export. The formatted x is cached chunk
+    by chunk and reused for each member, up to TEMPLATE_CACHE_SIZE characters.
+    Chunks beyond it are formatted again on each export. The data should not be
+    modified in place after the first export.
+
+    Args:
+        x (array-like or path) : shared abscissa
+        ys (2d array-like or path) : ordinates, one row for each member. See _load_array
+
+    Public attributes:
+        x (1d array)
+        ys (2d array)
+    """
+    def __init__(self, x, ys):
+        self.x = _as_column(x, "x")
+        self.ys = _load_array(ys)
+        if self.ys.ndim != 2 or self.ys.shape[1] != len(self.x):
+            raise ValueError("ys should be 2d with rows of the same size as x", self.ys.shape)
+        self._templates = {}
+        self._cached = 0
+
+    def __len__(self):
+        return len(self.ys)
+
+    def _get_templates(self, forms, sep):
+        """get the printf-style templates of each chunk of lines with x already formatted
+
+        Returns:
+            generator of str, or None if the lines cannot be formatted in bulk
+        """
+        pforms = [_printf_form(f) for f in forms]
+        if None in pforms or self.x.dtype.kind not in "biuf":
+            return None
+        return self._iter_templates(forms, sep, sep.replace("%", "%%") + pforms[1])
+
+    def _iter_templates(self, forms, sep, suffix):
+        """backend of _get_templates. Templates are formatted on first use and cached
+        as long as the cache is within TEMPLATE_CACHE_SIZE"""
+        templates = self._templates.setdefault((tuple(forms), sep), {})
+        for i in range(0, len(self.x), CHUNK_SIZE):
+            template = templates.get(i)
+            if template is None:
+                block = next(_iter_format_rows([self.x[i:i+CHUNK_SIZE],], forms[:1], sep))
+                lines = block.replace("%", "%%").split("\n")
+                template = (suffix + "\n").join(lines) + suffix
+                if self._cached + len(template) <= TEMPLATE_CACHE_SIZE:
+                    templates[i] = template
+                    self._cached += len(template)
+            yield template
+
+    def _iter_export_y(self, y, form=None, sep=None):
+        """iterate over blocks of lines of the shared x and `y` of a member
+
+        See _iter_export_2d_data for arguments in the transposed case.
+
+        Returns:
+            generator of str, or None if the lines cannot be formatted in bulk
+        """
+        if form is None:
+            form = '{:f}'
+        if sep is None:
+            sep = " "
+        forms = [form,] * 2 if isinstance(form, str) else list(form)
+        y = np.asarray(y)
+        if y.dtype.kind not in "biuf":
+            return None
+        templates = self._get_templates(forms, sep)
+        if templates is None:
+            return None
+        return (t % tuple(y[i*CHUNK_SIZE:(i+1)*CHUNK_SIZE].tolist())
+                for i, t in enumerate(templates))
+
+
+def _decimate_minmax(x, y, npixels):
+    """index of the points with min and max y in each of `npixels` buckets
+
+    The first and last points are always kept.
+    See Data.decimate_index for arguments and return.
+    """
+    n = len(y)
+    if n <= 2 * npixels + 2:
+        return None
+    width = -(-n // npixels)
+    nfull = n // width
+    y = np.asarray(y)
+    blocks = y[:nfull*width].reshape(nfull, width)
+    starts = np.arange(nfull) * width
+    index = [np.array([0, n-1]), starts + blocks.argmin(axis=1), starts + blocks.argmax(axis=1)]
+    if nfull * width < n:
+        rest = y[nfull*width:]
+        index.append(np.array([nfull*width + rest.argmin(), nfull*width + rest.argmax()]))
+    return np.unique(np.concatenate(index))
+
+
+def _decimate_lttb(x, y, npixels):
+    """index of the points kept by largest-triangle-three-buckets
+
+    The points between the first and last points are divided into 2 * `npixels` buckets.
+    In each bucket, the point making the largest triangle with the point kept
+    in the previous bucket and the average of the next bucket is kept.
+    See Data.decimate_index for arguments and return.
+
+    The point kept in a bucket depends on the one kept in the previous bucket,
+    so the buckets are visited in order: the Python loop runs 2 * `npixels` times
+    whatever the number of points, each step working on a slice of the arrays.
+    The total work is O(n) in numpy plus O(`npixels`) Python steps,
+    and no copy of `x` or `y` is made beyond the float conversion.
+    """
+    n = len(y)
+    nbuckets = 2 * npixels
+    if n <= nbuckets + 2:
+        return None
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = 1 + (np.arange(nbuckets + 1) * (n - 2)) // nbuckets
+    # averages of the next bucket, the last point serving as the bucket after the last
+    counts = np.diff(edges)
+    xavg = np.append(np.add.reduceat(x[1:n-1], edges[:-1] - 1) / counts, x[-1])[1:]
+    yavg = np.append(np.add.reduceat(y[1:n-1], edges[:-1] - 1) / counts, y[-1])[1:]
+    index = np.empty(nbuckets + 2, dtype=int)
+    index[0], index[-1] = 0, n - 1
+    a = 0
+    # sequential by construction, see the docstring
+    for i in range(nbuckets):
+        s, e = edges[i], edges[i+1]
+        xa, ya = x[a], y[a]
+        area = np.abs((xa - xavg[i]) * (y[s:e] - ya) - (xa - x[s:e]) * (yavg[i] - ya))
+        a = s + area.argmax()
+        index[i+1] = a
+    return index
+
+
+def _valid_mask(columns):
+    """mask of the points which are finite and not masked in all columns, None if all are
+
+    The columns are scanned in chunks of SCAN_SIZE values, so that only the mask
+    itself is allocated in full, and only if any point is invalid.
+    """
+    n = len(columns[0]) if columns else 0
+    valid = None
+    for i in range(0, n, SCAN_SIZE):
+        invalid = None
+        for c in columns:
+            chunk = c[i:i+SCAN_SIZE]
+            bad = np.ma.getmask(chunk)
+            if chunk.dtype.kind in "fc":
+                bad = ~np.isfinite(np.ma.getdata(chunk)) | bad
+            if bad is np.ma.nomask or not bad.any():
+                continue
+            invalid = bad if invalid is None else invalid | bad
+        if invalid is not None:
+            if valid is None:
+                valid = np.ones(n, dtype=bool)
+            valid[i:i+SCAN_SIZE] = ~invalid
+    return valid
+
+
+def _clip_box(xlo, xhi, ylo, yhi, xmin, ymin, xmax, ymax):
+    """index of the points kept by clipping their spans to a box
+
+    Each point gets an outcode of the regions around the box as in the
+    Cohen-Sutherland algorithm. Points inside and points next to a
+    different outcode are kept. See Data.clip_index for the return.
+    """
+    codes = np.asarray(xhi < xmin).view(np.uint8) \
+        | (np.asarray(xlo > xmax).view(np.uint8) << 1) \
+        | (np.asarray(yhi < ymin).view(np.uint8) << 2) \
+        | (np.asarray(ylo > ymax).view(np.uint8) << 3)
+    keep = codes == 0
+    changed = codes[1:] != codes[:-1]
+    keep[1:] |= changed
+    keep[:-1] |= changed
+    if keep.all():
+        return None
+    return np.flatnonzero(keep)
+
+
+def _simplify_dp(x, y, tolerance, xscale=1.0, yscale=1.0):
+    """index of the points kept by Douglas-Peucker simplification
+
+    All segments of the same depth are split at once with vectorized distances.
+    See Data.simplify_index for arguments and return.
+    """
+    n = len(y)
+    if n < 3:
+        return None
+    x = np.asarray(x, dtype=float) * xscale
+    y = np.asarray(y, dtype=float) * yscale
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    # points to check and the segments they belong to, in ascending order
+    idx = np.arange(1, n - 1)
+    seg = np.zeros(n - 2, dtype=int)
+    starts, ends = np.array([0]), np.array([n - 1])
+    while len(idx):
+        # the line through each segment as a * x + b * y + c = 0, with a^2 + b^2 = 1
+        x0, y0 = x[starts], y[starts]
+        dx, dy = x[ends] - x0, y[ends] - y0
+        norm = np.hypot(dx, dy)
+        degenerate = norm == 0
+        norm[degenerate] = 1.0
+        a, b = -dy / norm, dx / norm
+        c = -(a * x0 + b * y0)
+        xi, yi = x[idx], y[idx]
+        dist = np.abs(a[seg] * xi + b[seg] * yi + c[seg])
+        if degenerate.any():
+            # distance to the start point for segments of zero length
+            m = degenerate[seg]
+            dist[m] = np.hypot(xi[m] - x0[seg[m]], yi[m] - y0[seg[m]])
+        offsets = np.flatnonzero(np.diff(seg, prepend=-1))
+        dmax = np.zeros(len(starts))
+        dmax[seg[offsets]] = np.maximum.reduceat(dist, offsets)
+        # the first point with the maximal distance in each segment
+        farthest = np.flatnonzero(dist == dmax[seg])
+        farthest = farthest[np.flatnonzero(np.diff(seg[farthest], prepend=-1))]
+        split = np.zeros(len(starts), dtype=int)
+        split[seg[farthest]] = idx[farthest]
+        far = dmax > tolerance
+        keep[split[far]] = True
+        # split the far segments into halves, and drop the points of the others
+        alive = far[seg] & (idx != split[seg])
+        idx, seg = idx[alive], seg[alive]
+        rank = np.cumsum(far) - 1
+        seg = 2 * rank[seg] + (idx > split[seg])
+        split = split[far]
+        starts = np.column_stack([starts[far], split]).ravel()
+        ends = np.column_stack([split, ends[far]]).ravel()
+    if keep.all():
+        return None
+    return np.flatnonzero(keep)
+
+
+# decimation methods available in Data.decimate_index
+DECIMATORS = {
+    "minmax": _decimate_minmax,
+    "lttb": _decimate_lttb,
+    }
+
+
+def _load_array(a):
+    """convert to an array without copy if possible
+
+    A path, either str or path-like object, is taken as a .npy file and
+    loaded as a read-only memory map, so that data larger than memory can be
+    exported chunk by chunk.
+    """
+    if isinstance(a, (str, PathLike)):
+        return np.load(a, mmap_mode="r")
+    return np.asanyarray(a)
+
+
+def _extremes(a, finite=False):
+    """get the min and max of a 1d array in a single pass over chunks of SCAN_SIZE values
+
+    Masked values of a masked array are ignored.
+
+    Args:
+        a (1d array)
+        finite (bool) : if True, NaN and inf are ignored
+
+    Returns:
+        tuple, (min, max)
+    """
+    lows, highs = [], []
+    for i in range(0, len(a), SCAN_SIZE):
+        chunk = a[i:i+SCAN_SIZE]
+        mask = np.ma.getmask(chunk)
+        chunk = np.ma.getdata(chunk)
+        if mask is not np.ma.nomask and mask.any():
+            chunk = chunk[~mask]
+            if not len(chunk):
+                continue
+        low, high = chunk.min(), chunk.max()
+        # both are finite only if all values are, otherwise filter and retry
+        if finite and not (np.isfinite(low) and np.isfinite(high)):
+            chunk = chunk[np.isfinite(chunk)]
+            if not len(chunk):
+                continue
+            low, high = chunk.min(), chunk.max()
+        lows.append(low)
+        highs.append(high)
+    if not lows:
+        raise ValueError("no {}value to get extremes".format("finite " if finite else ""))
+    return np.min(lows), np.max(highs)
+
+
+def _as_column(a, name, n=None):
+    """convert a data column to a 1d array
+
+    Arrays, including memory maps, are kept as they are without copy.
+    Other array-likes are converted. See _load_array
+
+    Args:
+        a (array-like)
+        name (str) : name of the column in error message
+        n (int) : the required size
+    """
+    a = _load_array(a)
+    if a.ndim != 1:
+        raise ValueError("data column {} should be 1d".format(name), a.shape)
+    if n is not None and len(a) != n:
+        raise ValueError("size of {} is inconsistent with x".format(name), len(a), n)
+    return a
+
+
+def _printf_form(form):
+    """translate the new-style format string of a single number to the printf-style one
+
+    Only specs with an exact printf counterpart are translated, e.g. "{:8.3f}" to "%8.3f".
+
+    Returns:
+        str, or None if there is no exact counterpart
+    """
+    m = _FORM_PATTERN.match(form)
+    if m is None:
+        return None
+    return "%" + "".join(g for g in m.groups() if g)
+
+
+def _iter_format_rows(rows, forms, sep, mask=None):
+    """iterate over blocks of lines formatted from rows of a 2-dimension data
+
+    Each block is a string of at most CHUNK_SIZE lines joined by newline.
+    Blocks are formatted with a single printf-style formatting if the data
+    are real numbers and each format in `forms` can be translated.
+    Otherwise fall back to formatting value by value.
+
+    Args:
+        rows (2d array or list of 1d arrays): data. A list is taken as the columns,
+            so that only one block of rows is stacked at a time
+        forms (list of str): format string of each column
+        sep (str)
+        mask (1d bool array): if set, only the rows where mask is True are formatted.
+            Blocks without any such row are skipped
+    """
+    if isinstance(rows, list):
+        n, ncols = (len(rows[0]) if rows else 0), len(rows)
+        kind = np.result_type(*rows).kind if rows else "f"
+        get_chunk = lambda i: np.column_stack([c[i:i+CHUNK_SIZE] for c in rows])
+    else:
+        n, ncols = rows.shape
+        kind = rows.dtype.kind
+        get_chunk = lambda i: rows[i:i+CHUNK_SIZE]
+    pforms = [_printf_form(f) for f in forms]
+    bulk = kind in "biuf" and None not in pforms and len(pforms) == ncols
+    if bulk:
+        template = sep.replace("%", "%%").join(pforms)
+    for i in range(0, n, CHUNK_SIZE):
+        chunk = get_chunk(i)
+        if mask is not None:
+            chunk = chunk[mask[i:i+CHUNK_SIZE]]
+            if not len(chunk):
+                continue
+        if bulk:
+            yield "\n".join([template,] * len(chunk)) % tuple(chunk.ravel().tolist())
+        else:
+            yield "\n".join(sep.join([f.format(x) for f, x in zip(forms, row)]) for row in chunk)
+
+
+def _iter_export_2d_data(data, form=None, transpose=False, sep=None, mask=None):
+    """iterate over blocks of lines printed from the 2-dimension data
+
+    See _export_2d_data for arguments, and _iter_format_rows for mask,
+    which is only used when transpose is True.
+    Each block is a string of one or more lines joined by newline.
+    """
+    if form is None:
+        form = '{:f}'
+    if sep is None:
+        sep = " "
+    if not isinstance(form, (str, list, tuple)):
+        raise ValueError("invalid format string {}".format(form))
+    if transpose:
+        # each member of data makes a column of lines, no need to transpose in memory
+        rows = [np.asarray(x) for x in data]
+        l = len(rows)
+    else:
+        rows = np.asarray(data)
+        l = rows.shape[1]
+    if isinstance(form, str):
+        forms = [form,] * l
+    elif transpose:
+        # array = (x1, y1, z1)
+        forms = list(form)
+    else:
+        # array = (x1, x2, x3)
+        for i in range(len(rows)):
+            for block in _iter_format_rows(rows[i:i+1], [form[i],] * l, sep):
+                yield block
+        return
+    for block in _iter_format_rows(rows, forms, sep, mask):
+        yield block
+
+
 def _export_2d_data(data, form=None, transpose=False, sep=None):
     """print the 2-dimension data into list of strings
 
@@ -284,29 +1099,6 @@ def _export_2d_data(data, form=None, transpose=False, sep=None):
 
     """
     slist = []
-    if form is None:
-        if transpose:
-            l = len([x[0] for x in data])
-        else:
-            l = len(data[0])
-        form = ['{:f}',] * l
-
-    if sep is None:
-        sep = " "
-    if transpose:
-        data = np.transpose(data)
-    for i, array in enumerate(data):
-        if isinstance(form, str):
-            s = sep.join([form.format(x) for x in array])
-        elif isinstance(form, (list, tuple)):
-            if transpose:
-                # array = (x1, y1, z1)
-                s = sep.join([f.format(x) for f, x in zip(form, array)])
-            else:
-                # array = (x1, x2, x3)
-                s = sep.join([form[i].format(x) for x in array])
-        else:
-            raise ValueError("invalid format string {:s}".format(form))
-        slist.append(s)
+    for block in _iter_export_2d_data(data, form=form, transpose=transpose, sep=sep):
+        slist.extend(block.split("\n"))
     return slist
-
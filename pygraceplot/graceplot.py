@@ -8,7 +8,11 @@ whether xmgrace is installed or not.
 Therefore, platform-related functions are generally discarded. (minyez)
 """
 from __future__ import print_function
+import os
 import sys
+import hashlib
+import tempfile
+from shutil import copyfile, copymode
 from io import TextIOWrapper, FileIO
 # compatibility
 try:
@@ -20,6 +24,7 @@ try:
 except NameError:
     file = FileIO
 
+import numpy as np
 from numpy import shape, absolute
 
 from pygraceplot.map import FontMap
@@ -32,14 +37,21 @@ from pygraceplot.base import (plot_colormap, set_loclike_attr,
                               _Bar, _Errorbar,
                               _Title, _SubTitle, _Label, _Tick, _TickLabel,
                               _DrawString, _DrawLine, _DrawEllipse)
-from pygraceplot.data import Data
+from pygraceplot.data import Data, DataGroup, DECIMATORS, _load_array
 from pygraceplot.utils import encode_string, get_file_ext
 from pygraceplot.logger import create_logger
-from pygraceplot.commands import run_gracebat, ext2device
+from pygraceplot.commands import (run_gracebat, arun_gracebat, get_device, render_many,
+                                  _get_loop)
+from pygraceplot.cache import get_default_cache
 
 _logger = create_logger("graceobj")
 del create_logger
 
+try:
+    from pygraceplot.__config__ import decimate_dpi
+except ImportError:
+    decimate_dpi = 300
+
 class Region(_Region):
     """user interface of region"""
     def __init__(self, index, switch=None, ls=None, lw=None, rt=None,
@@ -92,11 +104,8 @@ class World(_WorldLike):
     """world of graph"""
     _marker = 'world'
     _attrs = set_loclike_attr(_marker, '{:8f}', ', ', 0., 0., 1., 1.)
-
-    def __init__(self, **kwargs):
-        _WorldLike.__init__(self, **kwargs)
-        self.set_world = self.set
-        self.get_world = self.get
+    set_world = _WorldLike.set
+    get_world = _WorldLike.get
 
 class StackWorld(_WorldLike):
     """stack world of graph"""
@@ -107,11 +116,8 @@ class View(_WorldLike):
     """View of graph on the image canvas """
     _marker = 'view'
     _attrs = set_loclike_attr(_marker, '{:8f}', ', ', 0.15, 0.10, 1.20, 0.85)
-
-    def __init__(self, **kwargs):
-        _WorldLike.__init__(self, **kwargs)
-        self.set_view = self.set
-        self.get_view = self.get
+    set_view = _WorldLike.set
+    get_view = _WorldLike.get
 
 class Znorm(_WorldLike):
     """stack world of graph"""
@@ -158,6 +164,7 @@ class Box(_Box):
 # pylint: disable=too-many-locals
 class Legend(_Legend):
     """User interface of legend object"""
+    __slots__ = ("box",)
     def __init__(self, switch=None, loc=None, loctype=None, font=None,
                  color=None, length=None, vgap=None, hgap=None, invert=None,
                  charsize=None,
@@ -168,8 +175,9 @@ class Legend(_Legend):
                          length=length, vgap=vgap, hgap=hgap, invert=invert, char_size=charsize)
         self.box = Box(color=bc, pattern=bp, lw=blw, ls=bls, fc=bfc, fp=bfp)
 
-    def export(self):
-        return _Legend.export(self) + [self._marker + " " + i for i in self.box.export()]
+    def _export(self, minimal=False):
+        return _Legend._export(self, minimal) + \
+               [self._marker + " " + i for i in self.box.export(minimal)]
 
     def set(self, switch=None, loc=None, loctype=None, font=None,
             color=None, length=None, vgap=None, hgap=None, invert=None,
@@ -396,6 +404,7 @@ class Tick(_Tick):
                 spec_major[i] = "minor"
         self.spec_ticks.extend(spec_ticks)
         self.spec_majors.extend(spec_major)
+        self._invalidate()
 
 class Bar(_Bar):
     """User interface of axis bar"""
@@ -410,6 +419,7 @@ class Bar(_Bar):
 
 class Label(_Label):
     """user interface of axis label"""
+    __slots__ = ("label",)
     def __init__(self, label=None, layout=None, place=None, offset=None, charsize=None,
                  font=None, color=None, **kwargs):
         _raise_unknown_attr(self, *kwargs)
@@ -434,10 +444,10 @@ class Label(_Label):
                   place=place, char_size=charsize,
                   font=font, place_location=offset)
 
-    def export(self):
+    def _export(self, minimal=False):
         _logger.debug("exporting label: %s", self.label)
         slist = [self._marker + " \"{:s}\"".format(encode_string(self.label)),]
-        slist += _Label.export(self)
+        slist += _Label._export(self, minimal)
         return slist
 
 # pylint: disable=too-many-locals
@@ -512,6 +522,7 @@ class Axis(_Axis):
         blw (number)
         mjls (str/int) : major tick line style
     """
+    __slots__ = ("_bar", "_tick", "_label", "_ticklabel")
 
     def __init__(self, axis, switch=None, at=None, offset=None,
                  bar=None, bc=None, bls=None, blw=None,
@@ -542,13 +553,13 @@ class Axis(_Axis):
         _raise_unknown_attr(self, *kwargs)
         self._set(axis_switch=Switch.get(switch), type=at, offset=offset)
 
-    def export(self):
+    def _export(self, minimal=False):
         if self.axis_switch is Switch.OFF:
             return [self._affix + self._marker + "  " + Switch.get_str(Switch.OFF),]
-        slist = _Axis.export(self)
+        slist = _Axis._export(self, minimal)
         header = [self._bar, self._label, self._tick, self._ticklabel]
         for x in header:
-            slist += [self._affix + self._marker + " " + i for i in x.export()]
+            slist += [self._affix + self._marker + " " + i for i in x.export(minimal)]
         return slist
 
     def bind(self, *axis):
@@ -617,8 +628,29 @@ class Dataset(_Dataset):
         ls (str/int) : line style
         lp (str/int) : line pattern
         lc (str/int) : line color
+        group (DataGroup) : the group sharing the abscissa, see Data
+        maxlen (int) : maximal number of data points kept by append, see Data
+        decimate (str) : method to decimate the data points on export,
+            see Data.decimate_index. None to export all points
+        simplify (float) : tolerance to simplify the polyline of data on export,
+            see Data.simplify_index. None to export all points.
+            It only applies when the set is drawn as a straight line without
+            symbols, error bars, annotations or droplines, and is ignored otherwise
+        simplify_units (str) : units of the simplification tolerance, "data" or "view"
+        clip (bool) : if True, drop the data points outside the world of graph on export,
+            see Data.clip_index
+        nonfinite (str) : treatment of NaN, inf and masked data points on export
+            "drop" : drop them
+            "split" : split the dataset into sets of consecutive valid points.
+                The extra sets follow all datasets of the graph in the same style without legend
+            None : export them as they are
         keyword arguments (arraylike): error data
     """
+    __slots__ = ("data", "_symbol", "_line", "_baseline", "_dropline", "_fill",
+                 "_avalue", "_errorbar", "decimate", "simplify", "simplify_units", "clip",
+                 "nonfinite")
+    nonfinite_modes = (None, "drop", "split")
+
     def __init__(self, index, x, y, label=None, color=None, datatype=None, comment=None,
                  symbol=None, ssize=None, sc=None, sp=None, sfc=None, sfp=None,
                  slw=None, sls=None, char=None, charfont=None, skip=None,
@@ -628,7 +660,8 @@ class Dataset(_Dataset):
                  prepend=None, append=None, offset=None,
                  errorbar=None, ebpos=None, ebc=None, ebp=None, ebsize=None, eblw=None,
                  ebls=None, ebrlw=None, ebrls=None, ebrc=None, ebrcl=None,
-                 **extras):
+                 group=None, maxlen=None, decimate=None, simplify=None, simplify_units="data",
+                 clip=False, nonfinite="drop", **extras):
         # pop comment and legend out to avoid duplicate arguments
         if label is None:
             label = ""
@@ -636,84 +669,150 @@ class Dataset(_Dataset):
             comment = ""
         label=encode_string(label)
         comment=encode_string(comment)
-        self.data = Data(x, y, datatype=datatype, label=label, comment=comment, **extras)
+        self.data = Data(x, y, datatype=datatype, label=label, comment=comment, group=group,
+                         maxlen=maxlen, **extras)
+        self.data.set_parent(self)
 
         _Dataset.__init__(self, index, type=self.data.datatype, comment=comment, legend=label)
+        self.set_decimate(decimate)
+        self.set_simplify(simplify, units=simplify_units)
+        self.set_clip(clip)
+        self.set_nonfinite(nonfinite)
         if sc is None:
             sc = color
         if sfc is None:
             sfc = color
-        self._symbol = Symbol(st=symbol, color=sc, size=ssize, pattern=sp, fc=sfc, fp=sfp, lw=slw,
-                              ls=sls, char=char, charfont=charfont, skip=skip)
+        self._symbol = Symbol.shared(st=symbol, color=sc, size=ssize, pattern=sp, fc=sfc, fp=sfp,
+                                     lw=slw, ls=sls, char=char, charfont=charfont, skip=skip)
         if lc is None:
             lc = color
-        self._line = Line(lt=line, color=lc, width=lw, style=ls, pattern=lp)
-        self._baseline = BaseLine(lt=blt, switch=baseline)
-        self._dropline = DropLine(switch=dropline)
+        self._line = Line.shared(lt=line, color=lc, width=lw, style=ls, pattern=lp)
+        self._baseline = BaseLine.shared(lt=blt, switch=baseline)
+        self._dropline = DropLine.shared(switch=dropline)
         if fc is None:
             fc = color
-        self._fill = Fill(ft=ft, rule=rule, color=fc, pattern=fp)
+        self._fill = Fill.shared(ft=ft, rule=rule, color=fc, pattern=fp)
         if ac is None:
             ac = color
-        self._avalue = Annotation(switch=anno, at=at, rot=rot, charsize=asize, color=ac, font=font,
-                                  af=af, append=append, prepend=prepend, prec=prec, offset=offset)
+        self._avalue = Annotation.shared(switch=anno, at=at, rot=rot, charsize=asize, color=ac,
+                                         font=font, af=af, append=append, prepend=prepend,
+                                         prec=prec, offset=offset)
         if ebc is None:
             ebc = color
-        self._errorbar = Errorbar(switch=errorbar, place=ebpos, color=ebc, pattern=ebp,
-                                  size=ebsize, lw=eblw, ls=ebls, rlw=ebrlw, rls=ebrls, rc=ebrc,
-                                  rcl=ebrcl)
+        self._errorbar = Errorbar.shared(switch=errorbar, place=ebpos, color=ebc, pattern=ebp,
+                                         size=ebsize, lw=eblw, ls=ebls, rlw=ebrlw, rls=ebrls,
+                                         rc=ebrc, rcl=ebrcl)
 
-    def xmin(self):
+    def xmin(self, finite=False):
         """get the minimal value of abscissa"""
-        return self.data.xmin()
+        return self.data.xmin(finite)
 
-    def xmax(self):
+    def xmax(self, finite=False):
         """get the maximal value of abscissa"""
-        return self.data.xmax()
+        return self.data.xmax(finite)
 
-    def min(self):
+    def min(self, finite=False):
         """get the minimal value of data"""
-        return self.data.min()
+        return self.data.min(finite)
 
-    def max(self):
+    def max(self, finite=False):
         """get the maximal value of data"""
-        return self.data.max()
+        return self.data.max(finite)
+
+    def xextremes(self, finite=False):
+        """get the minimal and maximal value of abscissa"""
+        return self.data.xextremes(finite)
+
+    def extremes(self, finite=False):
+        """get the minimal and maximal value of data"""
+        return self.data.extremes(finite)
+
+    def set_decimate(self, method):
+        """set the method to decimate data points on export. None to export all"""
+        if method is not None and method not in DECIMATORS:
+            raise ValueError("Unknown decimation method", method)
+        self.decimate = method
+
+    def append(self, x, y, **extras):
+        """append data points. See Data.append"""
+        self.data.append(x, y, **extras)
+
+    def set_nonfinite(self, mode):
+        """set the treatment of NaN, inf and masked data points on export"""
+        if mode not in self.nonfinite_modes:
+            raise ValueError("Unknown mode for non-finite data", mode)
+        self.nonfinite = mode
+
+    def n_segments(self):
+        """number of sets the dataset is exported to"""
+        if self.nonfinite != "split":
+            return 1
+        return max(1, len(self.data.valid_runs()))
+
+    def set_clip(self, clip=True):
+        """set if the data points outside the world of graph are dropped on export"""
+        self.clip = clip
+
+    def set_simplify(self, tolerance, units="data"):
+        """set the tolerance to simplify the polyline of data on export. None to export all
+
+        Simplification only keeps the straight polyline within tolerance.
+        It is skipped on export if the set draws anything else, see can_simplify
+
+        Args:
+            tolerance (float)
+            units (str) : "data" for the units of data, "view" for the view coordinates
+        """
+        if units not in ("data", "view"):
+            raise ValueError("units of tolerance should be data or view, got", units)
+        self.simplify = tolerance
+        self.simplify_units = units
+
+    def can_simplify(self):
+        """check if the set is drawn as a straight line only, which simplification keeps
+
+        Symbols, annotations and droplines are drawn at each data point,
+        error bars need the extra columns, and stairs change with the points dropped.
+        """
+        return self._line.type == LineType.STRAIGHT and self._symbol.type == Symbol.NONE \
+            and not self.data._extra_cols and not self._avalue.avalue_switch \
+            and not self._dropline.dropline_switch
 
     def set_symbol(self, **kwargs):
-        self._symbol.set(**kwargs)
+        self._own("_symbol").set(**kwargs)
 
     def set_line(self, **kwargs):
         """set attributes of data line"""
-        self._line.set(**kwargs)
+        self._own("_line").set(**kwargs)
 
     def set_baseline(self, **kwargs):
         """set attributes of baseline"""
-        self._baseline.set(**kwargs)
+        self._own("_baseline").set(**kwargs)
 
     def set_dropline(self, **kwargs):
         """set attributes of dropline"""
-        self._dropline.set(**kwargs)
+        self._own("_dropline").set(**kwargs)
 
     def set_fill(self, **kwargs):
         """set attributes of marker fill"""
-        self._fill.set(**kwargs)
+        self._own("_fill").set(**kwargs)
 
     def set_annotation(self, **kwargs):
         """set attributes of data annotation"""
-        self._avalue.set(**kwargs)
+        self._own("_avalue").set(**kwargs)
 
     def set_errorbar(self, **kwargs):
         """set attributes of error bar"""
-        self._errorbar.set(**kwargs)
+        self._own("_errorbar").set(**kwargs)
 
     @property
     def label(self):
         """string. label mark of the dataset"""
         return self.legend
 
-    def export(self):
+    def _export(self, minimal=False):
         """Export the header part of dataset"""
-        slists = _Dataset.export(self)
+        slists = _Dataset._export(self, minimal)
         to_exports = [self._symbol,
                       self._line,
                       self._baseline,
@@ -722,17 +821,79 @@ class Dataset(_Dataset):
                       self._avalue,
                       self._errorbar,]
         for ex in to_exports:
-            slists += [self._marker + self._affix + " " + i for i in ex.export()]
+            slists += [self._marker + self._affix + " " + i for i in ex.export(minimal)]
         return slists
 
-    def export_data(self, igraph):
+    def _export_segment(self, index, minimal=False):
+        """export the header of set `index` made of a segment of the dataset"""
+        segment = self.copy()
+        object.__setattr__(segment, "_affix", str(index))
+        object.__setattr__(segment, "legend", "")
+        return segment._export(minimal)
+
+    def export_data(self, igraph, npixels=None, vscale=None, world=None, segments=None):
         """Export the data part"""
-        slist = ['@target G' + str(igraph) + '.' + self._marker.upper() + self._affix,
-                 '@type ' + self.type,]
-        slist.extend(self.data.export(transpose=True))
-        slist.append('&')
+        slist = []
+        for s in self.iter_export_data(igraph, npixels=npixels, vscale=vscale, world=world,
+                                       segments=segments):
+            slist.extend(s.split("\n"))
         return slist
 
+    def iter_export_data(self, igraph, npixels=None, vscale=None, world=None, segments=None):
+        """Iterate over the data part.
+
+        Data lines are yielded in blocks, each as a string of lines joined by newline
+
+        Args:
+            igraph (int) : index of the graph
+            npixels (int) : number of pixels along x of the graph, used for decimation
+            vscale (2-member tuple) : factors to convert x and y from world to view coordinates,
+                used for simplification in view units
+            world (4-member list) : world of the graph, used for clipping
+            segments (list of int) : indices of the sets of segments after the first one,
+                when the dataset is split at invalid points
+        """
+        valid = None
+        if self.nonfinite is not None:
+            valid = self.data.valid_mask()
+        index = None
+        simplify = self.simplify if self.can_simplify() else None
+        reduced = (self.clip and world is not None) or simplify is not None or \
+            (self.decimate is not None and npixels is not None)
+        if valid is not None and reduced:
+            index = np.flatnonzero(valid)
+        if self.clip and world is not None:
+            index = self.data.clip_index(*world, index=index)
+        if simplify is not None:
+            scale = (1.0, 1.0)
+            if self.simplify_units == "view":
+                if vscale is None:
+                    raise ValueError("vscale is required to simplify in view units")
+                scale = vscale
+            index = self.data.simplify_index(simplify, *scale, index=index)
+        if self.decimate is not None and npixels is not None:
+            index = self.data.decimate_index(self.decimate, npixels, index=index)
+        # without reducing stages, invalid points are dropped block by block on export
+        # and segments are exported from views of the data, so that no full-length
+        # index or copy is made
+        if not segments:
+            mask = valid if index is None else None
+            pieces = [(self._affix, index, mask),]
+        else:
+            runs = self.data.valid_runs()
+            if index is None:
+                indices = [slice(start, stop) for start, stop in runs]
+            else:
+                indices = np.split(index, np.searchsorted(index, runs[1:, 0]))
+            pieces = zip([self._affix,] + [str(i) for i in segments], indices,
+                         [None,] * len(indices))
+        for affix, piece, mask in pieces:
+            yield '@target G' + str(igraph) + '.' + self._marker.upper() + affix
+            yield '@type ' + self.type
+            for block in self.data.iter_export(transpose=True, index=piece, mask=mask):
+                yield block
+            yield '&'
+
 class DrawString(_DrawString):
     """user interface of string drawing
 
@@ -750,9 +911,9 @@ class DrawString(_DrawString):
         self.__setattr__("def", encode_string(s))
         _raise_unknown_attr(self, *kwargs)
 
-    def export(self):
+    def _export(self, minimal=False):
         return ["with " + self._marker,] + \
-               ["    {:s}".format(s) for s in _DrawString.export(self)]
+               ["    {:s}".format(s) for s in _DrawString._export(self, minimal)]
 
 class DrawLine(_DrawLine):
     """user interface of drawing line object
@@ -773,8 +934,9 @@ class DrawLine(_DrawLine):
                            line_location=(start[0], start[1], end[0], end[1]))
         _raise_unknown_attr(self, *kwargs)
 
-    def export(self):
-        return ["with " + self._marker,] + ["    {:s}".format(s) for s in _DrawLine.export(self)] \
+    def _export(self, minimal=False):
+        return ["with " + self._marker,] \
+               + ["    {:s}".format(s) for s in _DrawLine._export(self, minimal)] \
                + [self._marker + " def"]
 
 class DrawEllipse(_DrawEllipse):
@@ -801,11 +963,54 @@ class DrawEllipse(_DrawEllipse):
                               fill_pattern=Pattern.get(fp))
         _raise_unknown_attr(self, *kwargs)
 
-    def export(self):
+    def _export(self, minimal=False):
         return ["with " + self._marker,] \
-               + ["    {:s}".format(s) for s in _DrawEllipse.export(self)] \
+               + ["    {:s}".format(s) for s in _DrawEllipse._export(self, minimal)] \
                + [self._marker + " def"]
 
+class _Component:
+    """descriptor of a component of graph, which is created on first access
+
+    Args:
+        factory (callable) : function to create the component with default setup
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = None
+        self._default_export = {}
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        c = obj._components.get(self.name)
+        if c is None:
+            # the export of graph is unchanged by a component with default setup
+            c = self.factory()
+            obj._components[self.name] = c
+            object.__setattr__(c, "_parent", obj)
+        return c
+
+    def __set__(self, obj, value):
+        obj._components[self.name] = value
+        obj._adopt(value)
+
+    def export(self, obj, minimal=False):
+        """export the component of graph `obj`.
+
+        The lines of default setup are used if it has not been created"""
+        c = obj._components.get(self.name)
+        if c is not None:
+            return c.export(minimal)
+        slist = self._default_export.get(minimal)
+        if slist is None:
+            slist = self.factory().export(minimal)
+            self._default_export[minimal] = slist
+        return slist
+
+
 # pylint: disable=too-many-locals
 class Graph(_Graph):
     """user interface of grace graph
@@ -819,6 +1024,29 @@ class Graph(_Graph):
         tc : title color
         stc : subtitle color
     """
+    __slots__ = ("_components", "_datasets", "_objects", "_extremes",
+                 "_if_xlim_set", "_if_ylim_set", "_if_xtick_set", "_if_ytick_set")
+    # extremes of data, dropped with the export cache when datasets change
+    _caches = ("_export_cache", "_extremes")
+    # components are created when they are first accessed
+    _world = _Component(World)
+    _stackworld = _Component(StackWorld)
+    _znorm = _Component(Znorm)
+    _view = _Component(View)
+    _title = _Component(Title)
+    _subtitle = _Component(SubTitle)
+    _xaxes = _Component(lambda: _Axes('x'))
+    _yaxes = _Component(lambda: _Axes('y'))
+    _xaxis = _Component(lambda: Axis('x'))
+    _yaxis = _Component(lambda: Axis('y'))
+    _altxaxis = _Component(lambda: Axis('altx', switch=Switch.OFF))
+    _altyaxis = _Component(lambda: Axis('alty', switch=Switch.OFF))
+    _legend = _Component(Legend)
+    _frame = _Component(Frame)
+    _header = [_world, _stackworld, _znorm, _view, _title, _subtitle,
+               _xaxes, _yaxes, _xaxis, _yaxis, _altxaxis, _altyaxis,
+               _legend, _frame]
+
     def __init__(self, index, xmin=None, ymin=None, xmax=None, ymax=None,
                  hidden=None, gt=None, stacked=None, barhgap=None,
                  fp=None, fpt=None, fpxy=None, fpform=None, fpprec=None,
@@ -829,27 +1057,18 @@ class Graph(_Graph):
         _Graph.__init__(self, index, hidden=hidden, type=gt, stacked=stacked, bar_hgap=barhgap,
                         fixedpoint_switch=Switch.get(fp), fixedpoint_type=fpt, fixedpoint_xy=fpxy,
                         fixedpoint_format=fpform, fixedpoint_prec=fpprec)
-        self._world = World()
+        self._components = {}
+        self._extremes = None
         self._if_xlim_set = any([xmin, xmax])
         self._if_ylim_set = any([ymin, ymax])
-        self.set_lim(xmin, ymin, xmax, ymax)
-        self._stackworld = StackWorld()
-        self._view = View()
-        self._znorm = Znorm()
-        self._title = Title(title=title, fontsize=tsize, color=tc)
-        self._subtitle = SubTitle(subtitle=subtitle, fontsize=stsize, color=stc)
+        if any(v is not None for v in [xmin, ymin, xmax, ymax]):
+            self.set_lim(xmin, ymin, xmax, ymax)
+        if any(v is not None for v in [title, tsize, tc]):
+            self._title = Title(title=title, fontsize=tsize, color=tc)
+        if any(v is not None for v in [subtitle, stsize, stc]):
+            self._subtitle = SubTitle(subtitle=subtitle, fontsize=stsize, color=stc)
         self._if_xtick_set = False
         self._if_ytick_set = False
-        self._xaxes = _Axes('x')
-        self._yaxes = _Axes('y')
-        #self._altxaxes = _Axes('altx', switch=Switch.OFF)
-        #self._altyaxes = _Axes('alty', switch=Switch.OFF)
-        self._xaxis = Axis('x')
-        self._yaxis = Axis('y')
-        self._altxaxis = Axis('altx', switch=Switch.OFF)
-        self._altyaxis = Axis('alty', switch=Switch.OFF)
-        self._legend = Legend()
-        self._frame = Frame()
         self._datasets = []
         self._objects = []
 
@@ -870,69 +1089,168 @@ class Graph(_Graph):
     def __getitem__(self, i):
         return self._datasets[i]
 
-    def xmin(self):
+    def xmin(self, finite=False):
         """get the minimal value of x-data"""
-        v = 0
-        if self._datasets:
-            v = min(ds.xmin() for ds in self._datasets)
-        return v
+        return self.xextremes(finite)[0]
 
-    def xmax(self):
+    def xmax(self, finite=False):
         """get the maximal value of x-data"""
-        v = 1
-        if self._datasets:
-            v = max(ds.xmax() for ds in self._datasets)
-        return v
+        return self.xextremes(finite)[1]
 
-    def min(self):
+    def min(self, finite=False):
         """get the minimal value of y/z-data"""
-        v = 0
-        if self._datasets:
-            v = min(ds.min() for ds in self._datasets)
-        return v
+        return self.extremes(finite)[0]
 
-    def max(self):
+    def max(self, finite=False):
         """get the maximal value of y/z-data"""
-        v = 1
-        if self._datasets:
-            v = max(ds.max() for ds in self._datasets)
+        return self.extremes(finite)[1]
+
+    def xextremes(self, finite=False):
+        """get the minimal and maximal value of x-data. (0, 1) without data
+
+        Args:
+            finite (bool) : if True, NaN and inf are ignored
+        """
+        v = self._get_extremes(finite)[:2]
+        if v[0] is None:
+            return 0, 1
+        return v
+
+    def extremes(self, finite=False):
+        """get the minimal and maximal value of y/z-data. (0, 1) without data
+
+        Args:
+            finite (bool) : if True, NaN and inf are ignored
+        """
+        v = self._get_extremes(finite)[2:]
+        if v[0] is None:
+            return 0, 1
+        return v
+
+    def _get_extremes(self, finite=False):
+        """get the aggregated extremes of data, (xmin, xmax, ymin, ymax)
+
+        Datasets without any (finite) value are skipped. A pair is None
+        if no dataset has data for it.
+        The aggregate is kept until any dataset changes.
+        Datasets added by plot meanwhile are folded into it.
+        """
+        cache = self._extremes
+        if cache is None:
+            cache = {}
+            object.__setattr__(self, "_extremes", cache)
+        n, v = cache.get(finite, (0, (None, None, None, None)))
+        for ds in self._datasets[n:]:
+            for i, get in ((0, ds.xextremes), (2, ds.extremes)):
+                try:
+                    vmin, vmax = get(finite)
+                except ValueError:
+                    continue
+                if v[i] is not None:
+                    vmin, vmax = min(v[i], vmin), max(v[i+1], vmax)
+                v = v[:i] + (vmin, vmax) + v[i+2:]
+        cache[finite] = (len(self._datasets), v)
         return v
 
     def tight_graph(self, nxticks=5, nyticks=5, xscale=1.1, yscale=1.1):
-        """make the graph looks tight by adopting x/y min/max as axis extremes"""
-        self.set_lim(xmin=self.xmin()-absolute(self.xmin())*(xscale-1.0),
-                     xmax=self.xmax()+absolute(self.xmax())*(xscale-1.0),
-                     ymin=self.min()-absolute(self.min())*(yscale-1.0),
-                     ymax=self.max()+absolute(self.max())*(yscale-1.0))
+        """make the graph looks tight by adopting x/y min/max as axis extremes
+
+        NaN and inf in data are ignored"""
+        xmin, xmax = self.xextremes(finite=True)
+        ymin, ymax = self.extremes(finite=True)
+        self.set_lim(xmin=xmin-absolute(xmin)*(xscale-1.0),
+                     xmax=xmax+absolute(xmax)*(xscale-1.0),
+                     ymin=ymin-absolute(ymin)*(yscale-1.0),
+                     ymax=ymax+absolute(ymax)*(yscale-1.0))
         xmin, ymin, xmax, ymax = self.get_limit()
         if not self._if_xtick_set:
             self._xaxis.set_major(major=(xmax-xmin)/nxticks)
         if not self._if_ytick_set:
             self._yaxis.set_major(major=(ymax-ymin)/nyticks)
 
-    def export(self):
+    def _export(self, minimal=False):
         """export the header of graph, including `with g` part and data header"""
-        slist = []
-        slist += _Graph.export(self)
+        slist = _Graph._export(self, minimal)
         slist.append("with g" + self._affix)
-        header = [self._world, self._stackworld,
-                  self._znorm, self._view, self._title, self._subtitle,
-                  self._xaxes, self._yaxes,
-                  #self._altxaxes, self._altyaxes,
-                  self._xaxis, self._yaxis,
-                  self._altxaxis, self._altyaxis,
-                  self._legend, self._frame,] + self._datasets
-        for x in header:
-            slist += ["    " + s for s in x.export()]
+        for c in self._header:
+            slist += ["    " + s for s in c.export(self, minimal)]
+        for x in self._datasets:
+            slist += ["    " + s for s in x.export(minimal)]
+        for x, segments in zip(self._datasets, self._get_segments()):
+            for i in segments:
+                slist += ["    " + s for s in x._export_segment(i, minimal)]
         return slist
 
-    def export_data(self):
+    def _get_segments(self):
+        """get the set indices of the segments after the first one of each dataset
+
+        Segments are made by datasets split at invalid data points.
+        Their sets follow all the datasets.
+        """
+        n = self.ndata
+        segments = []
+        for ds in self._datasets:
+            m = ds.n_segments() - 1
+            segments.append(list(range(n, n + m)))
+            n += m
+        return segments
+
+    def export_data(self, page_size=None):
         """export the dataset part"""
         slist = []
-        for ds in self._datasets:
-            slist += ds.export_data(igraph=self._index)
+        for s in self.iter_export_data(page_size=page_size):
+            slist.extend(s.split("\n"))
         return slist
 
+    def iter_export_data(self, page_size=None):
+        """iterate over the dataset part. See Dataset.iter_export_data
+
+        Args:
+            page_size (2-member list) : size of page in points,
+                used to get the number of pixels for data decimation.
+                Default to the size of a Grace page
+        """
+        npixels = None
+        if any(ds.decimate is not None for ds in self._datasets):
+            npixels = self.get_npixels(page_size)
+        vscale = None
+        if any(ds.simplify_units == "view" for ds in self._datasets):
+            vscale = self.get_vscale()
+        world = None
+        if any(ds.clip for ds in self._datasets):
+            world = self._world.get_world()
+        for ds, segments in zip(self._datasets, self._get_segments()):
+            for s in ds.iter_export_data(igraph=self._index, npixels=npixels, vscale=vscale,
+                                         world=world, segments=segments):
+                yield s
+
+    def get_vscale(self):
+        """get the factors to convert x and y from world to view coordinates
+
+        Returns:
+            tuple, (xscale, yscale)
+        """
+        vxmin, vymin, vxmax, vymax = self._view.get_view()
+        wxmin, wymin, wxmax, wymax = self._world.get_world()
+        return (abs(vxmax - vxmin) / abs(wxmax - wxmin),
+                abs(vymax - vymin) / abs(wymax - wymin))
+
+    def get_npixels(self, page_size=None, dpi=None):
+        """get the number of pixels along x of the graph
+
+        The view coordinate 1.0 corresponds to the shorter side of the page.
+
+        Args:
+            page_size (2-member list) : size of page in points. Default to that of a Grace page
+            dpi (float) : default to decimate_dpi
+        """
+        if page_size is None:
+            page_size = Page().size
+        if dpi is None:
+            dpi = decimate_dpi
+        xmin, _, xmax, _ = self._view.get_view()
+        return max(1, int(round(abs(xmax - xmin) * min(page_size) * dpi / 72.0)))
+
     @property
     def ndata(self):
         """Number of datasets in current graph"""
@@ -1027,11 +1345,24 @@ class Graph(_Graph):
         multiple y can be parsed along with one x.
         In this case, the keyword arguments except `label`
         will be parsed for each y. `label` will be parsed
-        only for the first set
+        only for the first set.
+        The sets share one x array, which is formatted only once on export,
+        unless `maxlen` is set for appending to each set.
+
+        x and ys can also be paths to .npy files, which are memory-mapped
+        and exported in chunks without loading the whole array
         """
+        ys = _load_array(ys)
         # check if a band structure like `y` data is parsed
         if len(shape(ys)) == 2:
             n = self.ndata
+            if kwargs.get("maxlen") is None:
+                group = DataGroup(x, ys)
+                x, ys = group.x, group.ys
+            else:
+                # each set is truncated and appended on its own, so x cannot be shared
+                group = None
+                x = _load_array(x)
             # check error in keyword arguments as well
             extras = {}
             for t in Data.extra_data:
@@ -1039,16 +1370,21 @@ class Graph(_Graph):
                     extras[t] = kwargs.pop(t)
             extras_first = {k: v[0] for k, v in extras.items()}
             extras_first.update(kwargs)
-            ds = [Dataset(n, x, ys[0], **extras_first),]
+            ds = [Dataset(n, x, ys[0], group=group, **extras_first),]
             kwargs.pop("label", None)
             for i, y in enumerate(ys[1:]):
                 extra = {k: v[i+1] for k, v in extras.items()}
                 extra.update(kwargs)
-                ds.append(Dataset(n+i+1, x, y, **extra))
+                ds.append(Dataset(n+i+1, x, y, group=group, **extra))
             self._datasets.extend(ds)
         else:
-            ds = Dataset(self.ndata, x, ys, **kwargs)
-            self._datasets.append(ds)
+            ds = [Dataset(self.ndata, x, ys, **kwargs),]
+            self._datasets.extend(ds)
+        # new datasets are folded into the extremes when they are requested
+        extremes = self._extremes
+        for d in ds:
+            self._adopt(d)
+        object.__setattr__(self, "_extremes", extremes)
 
     def set_legend(self, **kwargs):
         """set up the legend. For arguments, see Legend
@@ -1322,6 +1658,14 @@ def _set_graph_alignment(nrows, ncols, hgap=0.02, vgap=0.02, width_ratios=None,
                       i, *g._view.view_location)
     return graphs
 
+def _hash_file(path, size=65536):
+    """sha256 digest of the bytes in file `path`, read by blocks"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(size), b""):
+            h.update(block)
+    return h.digest()
+
 # ===== main object =====
 class Plot:
     """the general control object for the grace plot
@@ -1371,24 +1715,46 @@ class Plot:
 
     def __str__(self):
         """print the whole agr file"""
-        slist = self._head + ["background color {:d}".format(self._background_color),]
+        return "\n".join(self.iter_export())
+
+    def iter_export(self, minimal=False):
+        """iterate over the lines of the whole agr file
+
+        Header lines are yielded one by one, while data lines are yielded
+        in blocks, each as a string of lines joined by newline.
+
+        Args:
+            minimal (bool) : omit the attributes which have the default values of Grace
+        """
+        for s in self._comment_head:
+            yield s
+        # add @ to each header line
+        for s in self._iter_header(minimal):
+            yield "@" + s
+        # export all data
+        for g in self._graphs:
+            for s in g.iter_export_data(page_size=self._page.size):
+                yield s
+
+    def _iter_header(self, minimal=False):
+        """iterate over the header lines without the leading @"""
+        for s in self._head + ["background color {:d}".format(self._background_color),]:
+            yield s
         if self.description is not None:
-            slist.append("description \"{}\"".format(self.description))
-        headers = [self._page, self._fontmap, self._colormap,
-                   self._default, self._timestamp,] + self._regions
+            yield "description \"{}\"".format(self.description)
+        for s in self._page.export(minimal) + self._fontmap.export() + self._colormap.export():
+            yield s
+        headers = [self._default, self._timestamp,] + self._regions
         for h in headers:
-            slist += h.export()
+            for s in h.export(minimal):
+                yield s
         for g in self._graphs:
-            slist += g.export()
+            for s in g.iter_export(minimal):
+                yield s
         for g in self._graphs:
             for o in g.get_objects():
-                slist += o.export()
-        # add @ to each header line
-        slist = self._comment_head + ["@" + v for v in slist]
-        # export all data
-        for g in self._graphs:
-            slist += g.export_data()
-        return "\n".join(slist)
+                for s in o.export(minimal):
+                    yield s
 
     def set_default(self, **kwargs):
         """set default format"""
@@ -1498,25 +1864,75 @@ class Plot:
         for g in self._graphs:
             g.set_ylim(ymin=ymin, ymax=ymax)
 
-    def write(self, filename=sys.stdout, mode='w'):
+    def write(self, filename=sys.stdout, mode='w', only_if_changed=False, minimal=False):
         """write grace plot file to `fn`
 
         Args:
             filename (str or file handle)
             mode (str) : used only when `file` is set to a filename
+            only_if_changed (bool) : leave the file untouched if it has the same content.
+                Used only when `file` is set to a filename, and mode should be 'w'.
+                The new content is streamed to a temporary file while being hashed,
+                which then replaces the file if the hash differs from the existing one
+            minimal (bool) : omit the attributes which have the default values of Grace.
+                The defaults are those of Grace without a customized Default.agr template
+
+        Returns:
+            bool, True if the file is written
         """
         if isinstance(filename, str):
+            if only_if_changed and mode != 'w':
+                raise ValueError("only_if_changed requires mode 'w', got", mode)
+            if only_if_changed and os.path.isfile(filename):
+                return self._write_if_changed(filename, minimal)
             _logger.info("write agr to %s", filename)
-            fp = open(filename, mode)
-            print(str(self), file=fp)
-            fp.close()
-            return
+            with open(filename, mode) as fp:
+                self._write(fp, minimal=minimal)
+            return True
         if isinstance(filename, (TextIOWrapper, file)):
-            print(str(self), file=filename)
-            return
+            self._write(filename, minimal=minimal)
+            return True
         raise TypeError("expect str or TextIOWrapper type, got {}".format(type(filename)))
 
-    def savefig(self, figname, device=None):
+    def _write(self, fp, hasher=None, minimal=False):
+        """stream the agr lines to the file handle `fp` through its buffered write
+
+        Args:
+            hasher (hashlib object) : if set, update it with the written lines,
+                encoded to the bytes written by the text file `fp`
+            minimal (bool) : see write
+        """
+        lines = (s + "\n" for s in self.iter_export(minimal))
+        if hasher is None:
+            fp.writelines(lines)
+            return
+        for s in lines:
+            fp.write(s)
+            if os.linesep != "\n":
+                s = s.replace("\n", os.linesep)
+            hasher.update(s.encode(fp.encoding))
+
+    def _write_if_changed(self, filename, minimal=False):
+        """write to an existing file only if the content changes"""
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(prefix=".", suffix=".agr",
+                                   dir=os.path.dirname(os.path.abspath(filename)))
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                self._write(fp, hasher=h, minimal=minimal)
+            if h.digest() == _hash_file(filename):
+                _logger.info("agr unchanged, skip writing %s", filename)
+                return False
+            _logger.info("write agr to %s", filename)
+            copymode(filename, tmp)
+            os.replace(tmp, filename)
+            tmp = None
+            return True
+        finally:
+            if tmp is not None:
+                os.remove(tmp)
+
+    def savefig(self, figname, device=None, timeout=None, cache=None):
         """generating a figure file by ``filename`` which includes an extension.
 
         This method is adapted from PyGrace.grace
@@ -1524,14 +1940,93 @@ class Plot:
         Args:
             figname (str)
             device (str)
+            timeout (float) : seconds to wait for gracebat. See commands.run_gracebat
+            cache (RenderCache) : cache of rendered figures. Default to cache.get_default_cache().
+                Set False to always render by gracebat
+        """
+        device = get_device(figname, device)
+        if cache is None:
+            cache = get_default_cache()
+        chunks = (s + "\n" for s in self.iter_export())
+        if not cache:
+            run_gracebat(chunks, figname, device, timeout=timeout)
+            return
+        # the timestamp string changes by session, which matters only when it is shown
+        skip = None
+        if self._timestamp.timestamp_switch != Switch.ON:
+            skip = "@timestamp def"
+        cache.render(chunks, figname, device, timeout=timeout, skip=skip)
+
+    def export_all(self, filenames, workers=None, timeout=None):
+        """write agr and figure files from a single serialization
+
+        The agr is written once, to the first agr file in `filenames`, or a temporary file
+        if there is none. The figures are then rendered from it by gracebat in parallel.
+
+        Args:
+            filenames (Iterable of str) : agr files and figure files, the device of
+                figure is determined by its extension
+            workers (int) : number of gracebat processes at the same time. See commands.render_many
+            timeout (float)
+
+        Raises:
+            the first error of rendering figures, after all figures are finished
+
+        Returns:
+            list of commands.RenderResult of figures
+        """
+        filenames = list(filenames)
+        agrs = [f for f in filenames if get_file_ext(f).lower() == "agr"]
+        figs = [f for f in filenames if get_file_ext(f).lower() != "agr"]
+        if agrs:
+            pagr = agrs[0]
+            self.write(pagr)
+            for f in agrs[1:]:
+                copyfile(pagr, f)
+        else:
+            fd, pagr = tempfile.mkstemp(suffix=".agr")
+            with os.fdopen(fd, 'w') as fp:
+                self._write(fp)
+        try:
+            results = render_many([(pagr, f) for f in figs], workers=workers, timeout=timeout)
+        finally:
+            if not agrs:
+                os.remove(pagr)
+        for r in results:
+            if not r.ok:
+                raise r.error
+        return results
+
+    async def awrite(self, filename, mode='w'):
+        """coroutine version of write. The agr is written in the default executor of the loop
+
+        Args:
+            filename (str or file handle)
+            mode (str)
+        """
+        loop = _get_loop()
+        await loop.run_in_executor(None, self.write, filename, mode)
+
+    async def asavefig(self, figname, device=None, timeout=None, cache=None):
+        """coroutine version of savefig. See commands.arun_gracebat
+
+        With a render cache, savefig is run in the default executor of the loop instead.
+
+        Args:
+            figname (str)
+            device (str)
+            timeout (float)
+            cache (RenderCache) : see savefig
         """
-        ext = get_file_ext(figname)
-        if device is None:
-            try:
-                device = ext2device.get(ext.lower())
-            except KeyError:
-                raise ValueError("Unsupported device for extension {}".format(ext))
-        run_gracebat(str(self), figname, device)
+        device = get_device(figname, device)
+        if cache is None:
+            cache = get_default_cache()
+        if cache:
+            loop = _get_loop()
+            await loop.run_in_executor(None, self.savefig, figname, device, timeout, cache)
+            return
+        await arun_gracebat((s + "\n" for s in self.iter_export()), figname, device,
+                            timeout=timeout)
 
     def tight_graph(self, nxticks=5, nyticks=5, xscale=1.1, yscale=1.1):
         """make graph axis tight"""
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""helpers shared by the tests"""
+import unittest as ut
+import asyncio
+import os
+import stat
+import tempfile
+from pygraceplot import commands
+
+# a stand-in of gracebat, copying stdin or the agr file to the print file
+FAKE_GRACEBAT = """#!/bin/sh
+src=-
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -printfile) out=$2; shift ;;
+        -hdevice) shift ;;
+        -*) ;;
+        *) src=$1 ;;
+    esac
+    shift
+done
+cat "$src" > "$out"
+"""
+
+
+def run_async(coro):
+    """run the coroutine in a new event loop, as asyncio.run of Python 3.7 does"""
+    loop = asyncio.new_event_loop()
+    try:
+        # the loop is set so that the child watcher of subprocesses is attached to it
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+class FakeGracebatCase(ut.TestCase):
+    """test case running a stand-in gracebat from a temporary directory
+
+    The script defaults to FAKE_GRACEBAT and can be replaced by set_script.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.exe = os.path.join(self.tmpdir.name, "gracebat")
+        self.set_script(FAKE_GRACEBAT)
+        self.original = commands.has_gracebat
+        commands.has_gracebat = self.exe
+
+    def tearDown(self):
+        commands.has_gracebat = self.original
+        self.tmpdir.cleanup()
+
+    def set_script(self, script):
+        """write the shell script of the stand-in gracebat"""
+        with open(self.exe, 'w') as h:
+            h.write(script)
+        os.chmod(self.exe, os.stat(self.exe).st_mode | stat.S_IEXEC)
@@ -3,6 +3,36 @@
 
 import unittest as ut
 
+from pygraceplot.base import _BaseOutput, _Legend, Switch
+
+class test_BaseOutput(ut.TestCase):
+    """test the attribute table of output objects"""
+
+    def test_class_check(self):
+        """invalid attribute table is rejected at class creation"""
+        with self.assertRaises(ValueError):
+            type("_Bad", (_BaseOutput,), {"_attrs": {"color": (int, 1)}})
+        with self.assertRaises(TypeError):
+            type("_Bad", (_BaseOutput,), {"_attrs": [("color", int, 1, "{:d}")]})
+
+    def test_defaults(self):
+        """defaults are converted and not shared between instances"""
+        l1 = _Legend()
+        l2 = _Legend(legend_location=(0.1, 0.2), font=1.0)
+        self.assertEqual(Switch.ON, l1.legend_switch)
+        self.assertListEqual([0.1, 0.2], l2.legend_location)
+        self.assertIsInstance(l2.font, int)
+        self.assertEqual("False", l1.invert)
+        l1.legend_location[0] = 0.0
+        self.assertListEqual([0.75, 0.50], _Legend().legend_location)
+
+    def test_slots(self):
+        """attributes are stored in slots"""
+        l = _Legend()
+        self.assertFalse(hasattr(l, "__dict__"))
+        self.assertIn("legend_switch", _Legend.__slots__)
+        with self.assertRaises(AttributeError):
+            l.unknown = 1
+
 if __name__ == "__main__":
     ut.main()
-
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""test the render cache"""
+import unittest as ut
+import os
+from pygraceplot.cache import RenderCache
+from pygraceplot.graceplot import Plot
+from pygraceplot.test import FakeGracebatCase, run_async
+
+class test_RenderCache(FakeGracebatCase):
+    """test caching figures of plots"""
+
+    def test_hit_miss(self):
+        """identical plots and devices hit the cache"""
+        cache = RenderCache(os.path.join(self.tmpdir.name, "cache"))
+        fig = os.path.join(self.tmpdir.name, "test.eps")
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        p.savefig(fig, cache=cache)
+        p.savefig(fig, cache=cache)
+        self.assertEqual((1, 1), (cache.misses, cache.hits))
+        with open(fig, 'r') as h:
+            self.assertEqual(str(p) + "\n", h.read())
+        p.savefig(fig, device="PNG", cache=cache)
+        p.plot([0, 1], [1, 0])
+        p.savefig(fig, cache=cache)
+        self.assertEqual((3, 1), (cache.misses, cache.hits))
+        run_async(p.asavefig(fig, cache=cache))
+        self.assertEqual((3, 2), (cache.misses, cache.hits))
+
+    def test_eviction(self):
+        """least recently used figures are evicted beyond the size limit"""
+        cache = RenderCache(os.path.join(self.tmpdir.name, "cache"), hardlink=True)
+        figs = [os.path.join(self.tmpdir.name, "test{}.eps".format(i)) for i in range(3)]
+        plots = []
+        for i, fig in enumerate(figs):
+            p = Plot(1, 1)
+            p.plot([0, 1], [0, i])
+            p.savefig(fig, cache=cache)
+            plots.append(p)
+        size = os.path.getsize(figs[0])
+        cache.max_size = 2 * size
+        # make the first the most recently used
+        plots[0].savefig(figs[0], cache=cache)
+        cache.evict()
+        self.assertLessEqual(cache.size, 2 * size)
+        plots[1].savefig(figs[1], cache=cache)
+        plots[0].savefig(figs[0], cache=cache)
+        self.assertEqual((4, 2), (cache.misses, cache.hits))
+
+
+if __name__ == "__main__":
+    ut.main()
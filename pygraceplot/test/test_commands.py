@@ -2,8 +2,14 @@
 # -*- coding: utf-8 -*-
 """test commands"""
 import unittest as ut
+import asyncio
 import os
-from pygraceplot.commands import run_gracebat
+import threading
+import subprocess as sp
+from pygraceplot import commands
+from pygraceplot.commands import run_gracebat, arun_gracebat, render_many, set_max_gracebat
+from pygraceplot.graceplot import Plot
+from pygraceplot.test import FakeGracebatCase, run_async
 
 try:
     from shutil import which
@@ -32,5 +38,153 @@ class test_commands(ut.TestCase):
                                   "test agr stinrg", "test.eps", "EPS")
 
 
+class test_run_gracebat(FakeGracebatCase):
+    """test the lifecycle of gracebat process with a stand-in executable"""
+
+    def test_stream_chunks(self):
+        """chunks are all fed before returning"""
+        fig = os.path.join(self.tmpdir.name, "test.eps")
+        chunks = ["line {}\n".format(i) for i in range(10000)]
+        run_gracebat(iter(chunks), fig, "EPS")
+        with open(fig, 'r') as h:
+            self.assertEqual("".join(chunks), h.read())
+
+    def test_errors(self):
+        """exit code, stderr, timeout and missing output"""
+        fig = os.path.join(self.tmpdir.name, "test.eps")
+        self.set_script("#!/bin/sh\necho broken agr >&2\nexit 3\n")
+        with self.assertRaises(sp.CalledProcessError) as cm:
+            run_gracebat("agr", fig, "EPS")
+        self.assertEqual(3, cm.exception.returncode)
+        self.assertIn("broken agr", cm.exception.stderr)
+        self.set_script("#!/bin/sh\nexec sleep 10\n")
+        self.assertRaises(sp.TimeoutExpired, run_gracebat, "agr", fig, "EPS", timeout=0.2)
+        self.set_script("#!/bin/sh\ncat > /dev/null\n")
+        self.assertRaises(FileNotFoundError, run_gracebat, "agr", fig, "EPS")
+        # a stale figure from an earlier run does not pass
+        with open(fig, 'w') as h:
+            h.write("stale")
+        self.assertRaises(FileNotFoundError, run_gracebat, "agr", fig, "EPS")
+        with open(fig, 'w') as h:
+            h.write("stale")
+        self.assertRaises(FileNotFoundError, run_async, arun_gracebat("agr", fig, "EPS"))
+
+    def test_render_many(self):
+        """render plots and agr files in parallel"""
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        pagr = os.path.join(self.tmpdir.name, "test.agr")
+        p.write(pagr)
+        figs = [os.path.join(self.tmpdir.name, "test{}.{}".format(i, ext))
+                for i, ext in enumerate(["eps", "png", "svg", "unknown"])]
+        jobs = [(p, figs[0]), (pagr, figs[1]), (pagr, figs[2], "EPS"), (p, figs[3])]
+        results = render_many(jobs, workers=2)
+        self.assertListEqual([True, True, True, False], [r.ok for r in results])
+        self.assertListEqual(["EPS", "PNG", "EPS"], [r.device for r in results[:3]])
+        self.assertIsInstance(results[3].error, ValueError)
+        for fig in figs[:3]:
+            with open(fig, 'r') as h:
+                self.assertEqual(str(p) + "\n", h.read())
+
+    def test_export_all(self):
+        """agr and figures from one serialization"""
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        names = [os.path.join(self.tmpdir.name, "test." + ext) for ext in ["agr", "eps", "png"]]
+        results = p.export_all(names, workers=2)
+        self.assertListEqual(["EPS", "PNG"], [r.device for r in results])
+        for name in names:
+            with open(name, 'r') as h:
+                self.assertEqual(str(p) + "\n", h.read())
+        results = p.export_all(names[1:])
+        self.assertEqual(2, len(results))
+        self.assertRaises(ValueError, p.export_all, [names[0] + ".unknown"])
+
+    def test_async(self):
+        """render concurrently in an event loop"""
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        figs = [os.path.join(self.tmpdir.name, "test{}.eps".format(i)) for i in range(5)]
+        pagr = os.path.join(self.tmpdir.name, "test.agr")
+
+        async def render():
+            await asyncio.gather(p.awrite(pagr), *[p.asavefig(fig) for fig in figs])
+
+        run_async(render())
+        with open(pagr, 'r') as h:
+            agr = h.read()
+        for fig in figs:
+            with open(fig, 'r') as h:
+                self.assertEqual(agr, h.read())
+        self.set_script("#!/bin/sh\nexec sleep 10\n")
+        self.assertRaises(sp.TimeoutExpired, run_async,
+                          arun_gracebat("agr", figs[0], "EPS", timeout=0.2))
+
+        async def cancel():
+            task = asyncio.ensure_future(arun_gracebat("agr", figs[0], "EPS"))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            # cancel again while waiting for the killed gracebat
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            all_tasks = getattr(asyncio, "all_tasks", None) or asyncio.Task.all_tasks
+            pending = [t for t in all_tasks() if not t.done()]
+            # let the child exit, so that the transport is closed before the loop
+            await asyncio.sleep(0.6)
+            return pending
+
+        # the cancelled coroutine leaves no pending task behind,
+        # even if a child of gracebat still holds its stderr
+        self.set_script("#!/bin/sh\nsleep 0.5 &\nexec sleep 10\n")
+        self.assertEqual(1, len(run_async(cancel())))
+
+    def test_max_gracebat(self):
+        """threads and event loops share the limit of gracebat processes"""
+        running = os.path.join(self.tmpdir.name, "running")
+        os.mkdir(running)
+        log = os.path.join(self.tmpdir.name, "log")
+        self.set_script("""#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -printfile) out=$2; shift ;;
+    esac
+    shift
+done
+cat > /dev/null
+touch {0}/$$
+ls {0} | wc -l >> {1}
+sleep 0.1
+rm {0}/$$
+echo > "$out"
+""".format(running, log))
+        figs = [os.path.join(self.tmpdir.name, "test{}.eps".format(i)) for i in range(12)]
+
+        async def render(figs):
+            await asyncio.gather(*[arun_gracebat("agr", fig, "EPS") for fig in figs])
+
+        pagr = os.path.join(self.tmpdir.name, "test.agr")
+        with open(pagr, 'w') as h:
+            h.write("agr")
+        original = commands.max_gracebat
+        set_max_gracebat(2)
+        results = []
+        # subprocesses of event loops in other threads need Python 3.8
+        sync = threading.Thread(target=lambda: results.extend(
+            render_many([(pagr, fig, "EPS") for fig in figs[6:]], workers=6)))
+        try:
+            sync.start()
+            run_async(render(figs[:6]))
+            sync.join()
+        finally:
+            set_max_gracebat(original)
+        self.assertTrue(all(r.ok for r in results))
+        with open(log, 'r') as h:
+            counts = [int(l) for l in h]
+        self.assertEqual(12, len(counts))
+        self.assertLessEqual(max(counts), 2)
+
+
 if __name__ == "__main__":
     ut.main()
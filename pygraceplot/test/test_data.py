@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import unittest as ut
+import os
+import tempfile
+import threading
 import numpy as np
-from pygraceplot.data import Data
+from pygraceplot import data as data_module
+from pygraceplot.data import Data, DataGroup, CHUNK_SIZE
 
 class test_xy_data(ut.TestCase):
     """xy data object"""
@@ -12,6 +16,34 @@ class test_xy_data(ut.TestCase):
         e = [0.1, 0.2, 0.3]
         self.assertRaises(ValueError, Data, x, y + [5,])
         self.assertRaises(ValueError, Data, x, y, dx=e)
+        self.assertRaises(ValueError, Data, x, y, datatype="xydy", dy=e)
+        self.assertRaises(ValueError, Data, x, y, dz=x)
+        self.assertRaises(ValueError, Data, x, [y, y])
+        self.assertRaises(ValueError, Data, x, y, datatype="xydy", dy=None)
+
+    def test_none_extra(self):
+        """extra columns set to None are ignored"""
+        data = Data([1, 2], [3, 4], dy=None)
+        self.assertEqual("xy", data.datatype)
+        self.assertListEqual([], data._extra_cols)
+        data = Data([1, 2], [3, 4], dx=None, dy=[0.1, 0.2])
+        self.assertEqual("xydy", data.datatype)
+
+    def test_no_copy(self):
+        """arrays are kept without copy"""
+        x = np.linspace(0.0, 1.0, 5)
+        y = np.zeros((2, 5))
+        with tempfile.TemporaryDirectory() as d:
+            fn = os.path.join(d, "dy.npy")
+            np.save(fn, x)
+            dy = np.load(fn, mmap_mode="r")
+            data = Data(x, y[1], dy=dy)
+            self.assertIs(x, data.x)
+            self.assertTrue(np.shares_memory(y, data.y))
+            self.assertIs(dy, data.dy)
+            self.assertListEqual(Data(list(x), [0,] * 5, dy=list(x)).export(),
+                                 data.export())
+            del data, dy
 
     def test_get(self):
         """test data extraction"""
@@ -49,6 +81,236 @@ class test_xy_data(ut.TestCase):
         self.assertListEqual(s_normal_51f_42f, data.export(form=["{:5.1f}", "{:4.2f}"]))
         self.assertListEqual(s_transp_51f_42f,
                              data.export(form=["{:5.1f}", "{:4.2f}"], transpose=True))
-        
+
+    def test_export_bulk(self):
+        """bulk formatting agrees with formatting value by value"""
+        x = np.linspace(-1.0, 1.0, 25)
+        y = x ** 3
+        data = Data(x, y)
+        for form in ["{:f}", "{:+08.3e}", "{: g}", "{:#.0f}", "{:>8.2f}"]:
+            ref = ["%".join([form.format(a), form.format(b)]) for a, b in zip(x, y)]
+            self.assertListEqual(ref, data.export(form=form, transpose=True, sep="%"))
+
+    def test_iter_export(self):
+        """export in blocks of lines"""
+        n = CHUNK_SIZE * 2 + 3
+        data = Data(np.arange(n), np.arange(n) * 0.5)
+        blocks = list(data.iter_export(transpose=True))
+        self.assertEqual(3, len(blocks))
+        self.assertListEqual(data.export(transpose=True), "\n".join(blocks).split("\n"))
+
+    def test_group(self):
+        """grouped data share x and export the same as ungrouped"""
+        n = CHUNK_SIZE + 3
+        x = np.linspace(0.0, 1.0, n)
+        ys = np.array([x ** 2, -x, x * 100])
+        group = DataGroup(x, ys)
+        self.assertRaises(ValueError, DataGroup, x, ys[:, 1:])
+        self.assertRaises(ValueError, Data, x.copy(), ys[0], group=group)
+        self.assertRaises(ValueError, Data, group.x, ys[0], group=group, maxlen=5)
+        datas = [Data(group.x, y, group=group) for y in group.ys]
+        self.assertIs(datas[0].x, datas[1].x)
+        for y, data in zip(ys, datas):
+            ref = Data(x, y)
+            for form in [None, "{:8.3f}", ["{:.2e}", "{:g}"], "{:>8.2f}"]:
+                self.assertListEqual(ref.export(form=form, transpose=True, sep="%"),
+                                     data.export(form=form, transpose=True, sep="%"))
+        # the cache of formatted x is bounded, the rest is formatted on each export
+        cache_size = data_module.TEMPLATE_CACHE_SIZE
+        data_module.TEMPLATE_CACHE_SIZE = 1000
+        try:
+            group = DataGroup(x, ys)
+            data = Data(group.x, ys[1], group=group)
+            for _ in range(2):
+                self.assertListEqual(Data(x, ys[1]).export(transpose=True),
+                                     data.export(transpose=True))
+            self.assertLessEqual(group._cached, 1000)
+        finally:
+            data_module.TEMPLATE_CACHE_SIZE = cache_size
+        # replaced x is exported instead of the x of the group
+        datas[0].x = x * 12.0
+        self.assertEqual(12.0, datas[0].xmax())
+        self.assertListEqual(Data(x * 12.0, ys[0]).export(transpose=True),
+                             datas[0].export(transpose=True))
+        self.assertListEqual(Data(x, ys[1]).export(transpose=True),
+                             datas[1].export(transpose=True))
+
+    def test_decimate(self):
+        """decimation keeps the extremes and the extras of the kept points"""
+        n = 10007
+        x = np.linspace(0.0, 1.0, n)
+        y = np.sin(x * 50.0)
+        dy = np.arange(n) * 0.5
+        data = Data(x, y, dy=dy)
+        self.assertRaises(ValueError, data.decimate_index, "unknown", 100)
+        self.assertIsNone(data.decimate_index("minmax", n))
+        self.assertIsNone(data.decimate_index("lttb", n))
+        for method in ["minmax", "lttb"]:
+            index = data.decimate_index(method, 100)
+            self.assertLessEqual(len(index), 202)
+            self.assertListEqual([0, n-1], [index[0], index[-1]])
+            self.assertTrue(np.all(np.diff(index) > 0))
+            ref = Data(x[index], y[index], dy=dy[index])
+            self.assertListEqual(ref.export(transpose=True),
+                                 list("\n".join(data.iter_export(transpose=True, index=index))
+                                      .split("\n")))
+        index = data.decimate_index("minmax", 100)
+        self.assertEqual(y.max(), y[index].max())
+        self.assertEqual(y.min(), y[index].min())
+
+    def test_simplify(self):
+        """simplification drops the points on straight segments"""
+        x = np.linspace(0.0, 4.0, 401)
+        y = np.abs(np.abs(x - 2.0) - 1.0)
+        data = Data(x, y, dy=x)
+        self.assertListEqual([0, 100, 200, 300, 400], list(data.simplify_index(1e-9)))
+        self.assertListEqual([0, 400], list(data.simplify_index(1e-9, yscale=1e-10)))
+        index = data.simplify_index(1e-9, index=np.arange(0, 401, 50))
+        self.assertListEqual([0, 100, 200, 300, 400], list(index))
+        self.assertIsNone(Data([0, 1, 2], [0, 1, 0]).simplify_index(0.0))
+
+    def test_clip(self):
+        """clipping keeps the points around the box"""
+        x = np.arange(10.0)
+        y = np.array([5.0, 4.0, 3.0, 0.5, 0.5, 3.0, 3.0, -2.0, -3.0, -4.0])
+        data = Data(x, y)
+        self.assertListEqual([2, 3, 4, 5, 6, 7], list(data.clip_index(0.0, 0.0, 9.0, 1.0)))
+        self.assertListEqual([2, 3, 4, 5, 6, 7, 8], list(data.clip_index(0.0, -2.5, 9.0, 1.0)))
+        self.assertIsNone(data.clip_index(0.0, -4.0, 9.0, 5.0))
+        self.assertListEqual([3, 4, 5], list(data.clip_index(0.0, 0.0, 9.0, 1.0,
+                                                            index=np.arange(3, 6))))
+        dy = np.array([0, 0, 2.5, 0, 0, 0, 0, 0, 0, 0])
+        data = Data(x, y, dy=dy)
+        self.assertListEqual([1, 2, 3, 4, 5, 6, 7], list(data.clip_index(0.0, 0.0, 9.0, 1.0)))
+        data = Data(x, y, datatype="bar")
+        self.assertIsNone(data.clip_index(0.0, 0.0, 9.0, 1.0))
+        self.assertListEqual([0, 1, 2], list(data.clip_index(0.0, 0.0, 1.5, 1.0)))
+
+    def test_stats(self):
+        """extremes are cached until the data is replaced"""
+        x = np.array([0.0, 1.0, np.inf, 2.0])
+        y = np.array([np.nan, 1.0, -1.0, 3.0])
+        data = Data(x, y)
+        self.assertEqual(np.inf, data.xmax())
+        self.assertEqual(2.0, data.xmax(finite=True))
+        self.assertTrue(np.isnan(data.min()))
+        self.assertTupleEqual((-1.0, 3.0), data.extremes(finite=True))
+        self.assertIn(("y", True), data._stats)
+        data.y = np.array([0.0, 1.0, 2.0, 5.0])
+        self.assertDictEqual({}, data._stats)
+        self.assertEqual(5.0, data.max(finite=True))
+        self.assertRaises(ValueError, Data([np.nan,], [1.0,]).xmin, True)
+        # masked values are ignored like NaN
+        y = np.ma.masked_array([9.0, np.nan, 2.0, 3.0], mask=[1, 0, 0, 0])
+        data = Data(x, y)
+        self.assertTupleEqual((2.0, 3.0), data.extremes(finite=True))
+        data = Data(x, np.ma.masked_all(4))
+        self.assertRaises(ValueError, data.extremes, True)
+        self.assertRaises(ValueError, data.extremes)
+
+    def test_valid(self):
+        """mask of finite and unmasked data points"""
+        x = np.ma.masked_array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0], mask=[0, 0, 1, 0, 0, 0])
+        y = np.array([0.0, np.inf, 2.0, 3.0, 4.0, np.nan])
+        data = Data(x, y, dy=[0, 0, 0, 0, np.nan, 0])
+        self.assertListEqual([True, False, False, True, False, False], list(data.valid_mask()))
+        self.assertListEqual([[0, 1], [3, 4]], data.valid_runs().tolist())
+        data = Data([0, 1, 2], np.arange(3))
+        self.assertIsNone(data.valid_mask())
+        self.assertListEqual([[0, 3]], data.valid_runs().tolist())
+        data = Data([0, 1], [np.nan, np.nan])
+        self.assertEqual((0, 2), data.valid_runs().shape)
+        # scanned in chunks
+        scan_size = data_module.SCAN_SIZE
+        data_module.SCAN_SIZE = 4
+        try:
+            data = Data(x, y, dy=[0, 0, 0, 0, np.nan, 0])
+            self.assertListEqual([True, False, False, True, False, False],
+                                 list(data.valid_mask()))
+            self.assertIsNone(Data(np.arange(9.0), np.arange(9.0)).valid_mask())
+        finally:
+            data_module.SCAN_SIZE = scan_size
+
+    def test_export_mask(self):
+        """masked export applied block by block is the same as export at index"""
+        n = 2 * CHUNK_SIZE + 5
+        y = np.arange(n, dtype=float)
+        y[CHUNK_SIZE:2*CHUNK_SIZE] = np.nan
+        y[3] = np.nan
+        data = Data(np.arange(n), y)
+        valid = data.valid_mask()
+        ref = "\n".join(data.iter_export(transpose=True, index=np.flatnonzero(valid)))
+        blocks = list(data.iter_export(transpose=True, mask=valid))
+        self.assertEqual(2, len(blocks))
+        self.assertEqual(ref, "\n".join(blocks))
+        self.assertListEqual(list(data.iter_export(index=valid)),
+                             list(data.iter_export(mask=valid)))
+        self.assertRaises(ValueError, data.iter_export, index=[0,], mask=valid)
+
+    def test_append(self):
+        """appended data export the same as data built at once"""
+        x = np.arange(50.0)
+        y = np.sin(x)
+        dy = np.arange(50) % 7
+        data = Data(x[:3], y[:3], dy=dy[:3])
+        self.assertRaises(ValueError, data.append, x[3:5], y[3:5])
+        data.extremes()
+        data.export(transpose=True)
+        for i in range(3, 50, 4):
+            data.append(x[i:i+4], y[i:i+4], dy=dy[i:i+4])
+            ref = Data(x[:i+4], y[:i+4], dy=dy[:i+4])
+            self.assertListEqual(ref.export(transpose=True), data.export(transpose=True))
+            self.assertTupleEqual(ref.extremes(), data.extremes())
+        self.assertTrue(np.all(data.dy == dy))
+        data.append(50, 1.5, dy=0.5)
+        self.assertEqual(1.5, data.max())
+        self.assertEqual("50.000000 1.500000 0.500000", data.export(transpose=True)[-1])
+        # NaN appended after the extremes are cached
+        data = Data([0.0, 1.0], [1.0, 2.0])
+        data.extremes()
+        data.extremes(finite=True)
+        data.append([2.0,], [np.nan,])
+        ref = Data([0.0, 1.0, 2.0], [1.0, 2.0, np.nan])
+        self.assertTrue(np.isnan(data.min()) and np.isnan(data.max()))
+        self.assertTrue(np.isnan(ref.min()) and np.isnan(ref.max()))
+        self.assertTupleEqual(ref.extremes(finite=True), data.extremes(finite=True))
+
+    def test_append_maxlen(self):
+        """appended data in a sliding window"""
+        x = np.arange(100.0)
+        y = np.cos(x / 5.0)
+        y[37] = np.nan
+        data = Data(x[:20], y[:20], maxlen=10)
+        self.assertEqual(10, len(data.x))
+        data.export(transpose=True)
+        data.valid_mask()
+        data.extremes(finite=True)
+        for i in range(20, 100, 3):
+            data.append(x[i:i+3], y[i:i+3])
+            j = min(i + 3, 100)
+            ref = Data(x[j-10:j], y[j-10:j])
+            self.assertListEqual(ref.export(transpose=True), data.export(transpose=True))
+            self.assertTupleEqual(ref.extremes(finite=True), data.extremes(finite=True))
+            self.assertEqual(ref.valid_mask() is None, data.valid_mask() is None)
+        data.append(x, y)
+        self.assertListEqual(list(x[-10:]), list(data.x))
+
+    def test_append_threads(self):
+        """exports of appended data in several threads keep the cached lines intact"""
+        x = np.arange(4 * CHUNK_SIZE, dtype=float)
+        data = Data(x[:10], x[:10])
+        for i in range(10, len(x), CHUNK_SIZE // 2):
+            data.append(x[i:i+CHUNK_SIZE//2], x[i:i+CHUNK_SIZE//2])
+            ref = Data(x[:i+CHUNK_SIZE//2], x[:i+CHUNK_SIZE//2]).export(transpose=True)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(data.export(transpose=True)))
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            for r in results + [data.export(transpose=True),]:
+                self.assertListEqual(ref, r)
+
 if __name__ == "__main__":
     ut.main()
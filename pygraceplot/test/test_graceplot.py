@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 """Test graceplot"""
 import unittest as ut
+import os
 import tempfile
+import copy
+import pickle
+import numpy as np
 from itertools import product
 
 from pygraceplot.graceplot import (Color, Symbol, Label, Axis,
@@ -80,6 +84,17 @@ class test_Graph(ut.TestCase):
         g.subtitle = "Hello again"
         self.assertEqual(g.subtitle, "Hello again")
 
+    def test_lazy_components(self):
+        """components are created on access and exported as default otherwise"""
+        g = Graph(index=0)
+        self.assertDictEqual({}, g._components)
+        s = g.export()
+        g.get_axis('x')
+        self.assertIn("_xaxis", g._components)
+        self.assertListEqual(s, g.export())
+        g.set_xaxis(switch="off")
+        self.assertNotEqual(s, g.export())
+
     def test_change_view(self):
         """test if view changing is working"""
         g = Graph(index=1)
@@ -125,6 +140,108 @@ class test_Graph(ut.TestCase):
         self.assertEqual(g.xmax(), 2.3)
         self.assertEqual(g.min(), -1.2)
         self.assertEqual(g.max(), 3)
+        self.assertTupleEqual((-1, 2.3), g.xextremes())
+        self.assertTupleEqual((-1.2, 3), g.extremes())
+
+    def test_cached_extremes(self):
+        """extremes are aggregated as datasets are added, and dropped when data change"""
+        g = Graph(index=1)
+        g.plot([1, 2], [2, np.nan])
+        self.assertTupleEqual((2, 2), g.extremes(finite=True))
+        g.plot([0, 3], [-1, 4])
+        self.assertEqual(1, g._extremes[True][0])
+        self.assertTupleEqual((-1, 4), g.extremes(finite=True))
+        self.assertEqual((2, (0, 3, -1, 4)), g._extremes[True])
+        g[1].data.y = np.array([5, 6])
+        self.assertIsNone(g._extremes)
+        self.assertTupleEqual((2, 6), g.extremes(finite=True))
+        g.tight_graph()
+        self.assertEqual(6 * 1.1, g.get_limit()[3])
+
+    def test_nonfinite_extremes(self):
+        """datasets without finite values are skipped in the extremes"""
+        g = Graph(index=1)
+        g.plot([0, 1], [np.nan, np.nan])
+        self.assertTupleEqual((0, 1), g.xextremes(finite=True))
+        self.assertTupleEqual((0, 1), g.extremes(finite=True))
+        g.tight_graph()
+        g.plot([2, 3], [-1, 4])
+        g.plot([], [])
+        g.plot([1, 2], np.ma.masked_all(2))
+        self.assertTupleEqual((0, 3), g.xextremes(finite=True))
+        self.assertTupleEqual((-1, 4), g.extremes(finite=True))
+        g.tight_graph()
+        self.assertEqual(4 * 1.1, g.get_limit()[3])
+
+    def test_nonfinite(self):
+        """drop or split at invalid data points"""
+        g = Graph(index=0)
+        x = np.arange(7.0)
+        y = np.ma.masked_array([0.0, 1.0, np.nan, 3.0, 4.0, 5.0, 6.0],
+                               mask=[0, 0, 0, 0, 1, 0, 0])
+        g.plot(x, y, label="y")
+        g.plot(x, x, label="x")
+        self.assertListEqual(["@target G0.S0", "@type xy", "0.000000 0.000000",
+                              "1.000000 1.000000", "3.000000 3.000000",
+                              "5.000000 5.000000", "6.000000 6.000000", "&"],
+                             g[0].export_data(0))
+        self.assertRaises(ValueError, g[0].set_nonfinite, "gap")
+        g[0].set_nonfinite(None)
+        self.assertIn("2.000000 nan", g.export_data())
+        g[0].set_nonfinite("split")
+        s = g.export_data()
+        self.assertEqual(["@target G0.S0", "@type xy", "0.000000 0.000000",
+                          "1.000000 1.000000", "&"], s[:5])
+        self.assertIn("@target G0.S2", s)
+        i = s.index("@target G0.S3")
+        self.assertListEqual(["5.000000 5.000000", "6.000000 6.000000", "&", "@target G0.S1"],
+                             s[i+2:i+6])
+        header = g.export()
+        self.assertIn("    s3 legend \"\"", header)
+        self.assertIn("    s0 legend \"y\"", header)
+        self.assertEqual(len([l for l in header if l.startswith("    s0 ")]),
+                         len([l for l in header if l.startswith("    s3 ")]))
+
+    def test_append(self):
+        """append data to a plotted dataset"""
+        g = Graph(index=0)
+        g.plot([0.0, 1.0], [1.0, 2.0], maxlen=3)
+        self.assertTupleEqual((1.0, 2.0), g.extremes())
+        g[0].append([2.0, 3.0], [5.0, 3.0])
+        self.assertTupleEqual((2.0, 5.0), g.extremes())
+        self.assertListEqual(["1.000000 2.000000", "2.000000 5.000000", "3.000000 3.000000"],
+                             g.export_data()[2:-1])
+        # sets plotted with one x are truncated and appended one by one
+        g = Graph(index=0)
+        g.plot(np.arange(7.0), np.array([np.arange(7.0), -np.arange(7.0)]), maxlen=5)
+        ref = Graph(index=0)
+        ref.plot(np.arange(2.0, 7.0), np.arange(2.0, 7.0))
+        ref.plot(np.arange(2.0, 7.0), -np.arange(2.0, 7.0))
+        self.assertListEqual(ref.export_data(), g.export_data())
+        g[1].append([7.0,], [-7.0,])
+        self.assertListEqual(["3.000000 -3.000000", "7.000000 -7.000000"],
+                             [g.export_data()[i] for i in (10, -2)])
+
+    def test_plot_npy(self):
+        """plot data memory-mapped from npy files"""
+        x = np.linspace(0.0, 1.0, 7)
+        ys = np.array([x, x ** 2, -x])
+        ref = Graph(index=0)
+        ref.plot(x, ys)
+        ref.plot(x, ys[2])
+        g = Graph(index=0)
+        with tempfile.TemporaryDirectory() as d:
+            px, pys, py = [os.path.join(d, f) for f in ["x.npy", "ys.npy", "y.npy"]]
+            np.save(px, x)
+            np.save(pys, ys)
+            np.save(py, ys[2])
+            g.plot(px, pys)
+            g.plot(px, py)
+            self.assertIsInstance(g[0].data.y, np.memmap)
+            self.assertIsInstance(g[3].data.x, np.memmap)
+            self.assertListEqual(ref.export_data(), g.export_data())
+            self.assertTupleEqual(ref.extremes(), g.extremes())
+            del g
 
     def test_drawing(self):
         """test draing objects"""
@@ -141,6 +258,60 @@ class test_Graph(ut.TestCase):
         g.export()
 
 
+    def test_decimate(self):
+        """decimate data by the pixels of graph"""
+        g = Graph(index=0)
+        x = np.linspace(0.0, 1.0, 100000)
+        g.plot(x, np.cos(x), decimate="lttb")
+        g.plot(x, np.sin(x))
+        self.assertRaises(ValueError, g[1].set_decimate, "unknown")
+        npixels = g.get_npixels()
+        self.assertEqual(npixels, g.get_npixels([792, 612], dpi=300))
+        g.set_view(xmin=0.0, xmax=0.5)
+        self.assertEqual(638, g.get_npixels(dpi=150))
+        s = g.export_data()
+        self.assertEqual(2 * g.get_npixels() + 2 + 3 + 100000 + 3, len(s))
+        g[1].set_decimate("minmax")
+        self.assertGreater(len(s), len(g.export_data()))
+
+    def test_simplify(self):
+        """simplify data in data or view units"""
+        g = Graph(index=0)
+        x = np.linspace(0.0, 2.0, 2001)
+        g.plot(x, np.abs(x - 1.0), simplify=1e-9, symbol="none")
+        self.assertEqual(3 + 3, len(g.export_data()))
+        self.assertRaises(ValueError, g[0].set_simplify, 0.1, units="pixel")
+        g[0].set_simplify(0.01, units="view")
+        g.set_lim(xmin=0.0, xmax=2.0, ymin=0.0, ymax=1.0)
+        xmin, ymin, xmax, ymax = g.get_view()
+        self.assertTupleEqual(((xmax - xmin) / 2.0, ymax - ymin), g.get_vscale())
+        self.assertEqual(3 + 3, len(g.export_data()))
+        # skipped if the points are drawn other than a straight line
+        g[0].set_symbol(st="circle")
+        self.assertEqual(3 + 2001, len(g.export_data()))
+        g[0].set_symbol(st="none")
+        g[0].set_line(lt="stair")
+        self.assertEqual(3 + 2001, len(g.export_data()))
+        g = Graph(index=0)
+        g.plot(x, np.abs(x - 1.0), simplify=1e-9, symbol="none", dy=np.ones(2001))
+        self.assertFalse(g[0].can_simplify())
+        self.assertEqual(3 + 2001, len(g.export_data()))
+
+    def test_clip(self):
+        """clip data to the world of graph"""
+        g = Graph(index=0)
+        x = np.linspace(0.0, 10.0, 1001)
+        g.plot(x, x, clip=True)
+        g.plot(x, x)
+        g.set_lim(xmin=0.0, xmax=1.0, ymin=0.0, ymax=1.0)
+        s = g[0].export_data(0, world=g.get_limit())
+        self.assertEqual(3 + 102, len(s))
+        self.assertEqual("1.010000 1.010000", s[-2])
+        self.assertListEqual(s, g.export_data()[:len(s)])
+        g[0].set_clip(False)
+        self.assertEqual(2 * (3 + 1001), len(g.export_data()))
+
+
 class test_Plot(ut.TestCase):
     """test Plot functionality"""
 
@@ -196,8 +367,98 @@ class test_Plot(ut.TestCase):
         tf = tempfile.NamedTemporaryFile()
         with open(tf.name, 'w') as h:
             p.write(h)
+        with open(tf.name, 'r') as h:
+            self.assertEqual(str(p) + "\n", h.read())
         tf.close()
 
+    def test_write_only_if_changed(self):
+        """skip writing unchanged agr"""
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        with tempfile.TemporaryDirectory() as d:
+            fn = os.path.join(d, "test.agr")
+            self.assertTrue(p.write(fn, only_if_changed=True))
+            mtime = os.stat(fn).st_mtime_ns
+            self.assertFalse(p.write(fn, only_if_changed=True))
+            self.assertEqual(mtime, os.stat(fn).st_mtime_ns)
+            p.plot([0, 1], [1, 0])
+            self.assertTrue(p.write(fn, only_if_changed=True))
+            with open(fn, 'r') as h:
+                self.assertEqual(str(p) + "\n", h.read())
+            self.assertListEqual(["test.agr"], os.listdir(d))
+            # the same text in different bytes is rewritten
+            with open(fn, 'w', newline="\r\n") as h:
+                h.write(str(p) + "\n")
+            self.assertTrue(p.write(fn, only_if_changed=True))
+            with open(fn, 'rb') as h:
+                self.assertNotIn(b"\r\n", h.read())
+            self.assertRaises(ValueError, p.write, os.path.join(d, "new.agr"), mode='a',
+                              only_if_changed=True)
+            self.assertListEqual(["test.agr"], os.listdir(d))
+
+    def test_export_cache(self):
+        """cached export follows the changes of the objects"""
+        def build(changed):
+            p = Plot(1, 1)
+            p.plot([0, 1, 2], [3, 2, 1])
+            p.plot([0, 1, 2], [1, 2, 3])
+            if changed:
+                g = p.get()[0]
+                g[0].set_line(color="red")
+                g.set_lim(xmin=-1.0)
+                g.get_axis('x').set_spec([0, 1], labels=["A", "B"])
+                p.plot([0, 1], [1, 0])
+            return p
+        p = build(False)
+        s = str(p)
+        self.assertEqual(s, str(p))
+        g = p.get()[0]
+        cached = g[1]._export_cache
+        g[0].set_line(color="red")
+        self.assertIsNone(g._export_cache)
+        self.assertIs(cached, g[1]._export_cache)
+        g.set_lim(xmin=-1.0)
+        g.get_axis('x').set_spec([0, 1], labels=["A", "B"])
+        p.plot([0, 1], [1, 0])
+        self.assertNotEqual(s, str(p))
+        self.assertEqual(str(build(True)), str(p))
+
+    def test_copy_pickle(self):
+        """plots with datasets are deep-copied and pickled, keeping the data observed"""
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        p.plot([0, 1, 2], [[1, 2, 3], [2, 3, 4]])
+        s = str(p)
+        for new in [copy.deepcopy(p), pickle.loads(pickle.dumps(p))]:
+            self.assertEqual(s, str(new))
+            g = new.get()[0]
+            g[0].append([3,], [0,])
+            self.assertEqual(3, g.xmax())
+            self.assertNotEqual(s, str(new))
+            self.assertEqual(s, str(p))
+            self.assertEqual(2, p.get()[0].xmax())
+
+    def test_write_minimal(self):
+        """omit attributes with Grace defaults"""
+        p = Plot(1, 1)
+        p.plot([0, 1, 2], [3, 2, 1])
+        g = p.get()[0]
+        g.x.set_ticklabel(tlf="decimal")
+        full = list(p.iter_export())
+        minimal = list(p.iter_export(minimal=True))
+        self.assertLess(len(minimal), len(full))
+        for s in minimal:
+            self.assertIn(s, full)
+        self.assertIn("@    xaxis ticklabel format decimal", minimal)
+        self.assertNotIn("@    yaxis ticklabel format general", minimal)
+        self.assertIn("@r0  off", minimal)
+        self.assertNotIn("@link r0 to g0", minimal)
+        with tempfile.TemporaryDirectory() as d:
+            fn = os.path.join(d, "test.agr")
+            p.write(fn, minimal=True)
+            with open(fn, 'r') as h:
+                self.assertEqual("\n".join(minimal) + "\n", h.read())
+
 class test_Dataset(ut.TestCase):
     """test for Dataset"""
     def test_line(self):
@@ -212,6 +473,21 @@ class test_Dataset(ut.TestCase):
         d.set_errorbar(color="red")
         self.assertEqual(d._errorbar.color, Color.RED)
 
+    def test_shared_style(self):
+        """datasets share the same style until it is set"""
+        d1 = Dataset(0, [0,], [0,], color="red")
+        d2 = Dataset(1, [0,], [0,], color="red")
+        self.assertIs(d1._line, d2._line)
+        self.assertIsNot(d1._line, Dataset(2, [0,], [0,])._line)
+        with self.assertRaises(AttributeError):
+            d1._line.color = Color.BLUE
+        s2 = d2.export()
+        d1.set_line(color="blue")
+        self.assertIsNot(d1._line, d2._line)
+        self.assertEqual(d1._line.color, Color.BLUE)
+        self.assertEqual(d2._line.color, Color.RED)
+        self.assertListEqual(s2, d2.export())
+
 
 if __name__ == "__main__":
     ut.main()
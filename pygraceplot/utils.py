@@ -113,6 +113,9 @@ def encode_string(string):
     """
     if string is None:
         return None
+    # all markups need at least one of the characters
+    if "\\" not in string and "/" not in string and "{" not in string:
+        return string
     # greek letter
     for pat, agrstr in GREEK_PATTERN.items():
         string = sub(pat, agrstr, string)